@@ -0,0 +1,51 @@
+"""Helpers for scripts running in the Arbor Playground.
+
+Scripts use this as ``import arbor_playground``. The functions here wrap
+``arbor_playground_js``, the JavaScript module registered by the
+interpreter worker (worker.js), which forwards everything to the page.
+
+The worker imports this package while booting (see ``_stdio``), so only
+modules that don't need arbor or numpy are imported here. The rest is
+imported on first use, see ``__getattr__``.
+"""
+
+import importlib
+
+from arbor_playground_js import render_html
+
+from .runner import run
+from .sweep import sweep
+from .timeline import phase
+
+# name -> (module, attribute), attribute None for the module itself
+_LAZY = {
+    "plot": (".plotting", "plot"),
+    "raster": (".raster", "raster"),
+    "downsample": (".sampling", "downsample"),
+    "context": (".threads", "context"),
+    "num_threads": (".threads", "num_threads"),
+    "Ensemble": (".ensemble", "Ensemble"),
+    "StreamingRecorder": (".streaming", "StreamingRecorder"),
+    "cell_templates": (".cell_templates", None),
+    "connectivity": (".connectivity", None),
+    "ensemble": (".ensemble", None),
+    "meters": (".meters", None),
+    "sampling": (".sampling", None),
+}
+
+__all__ = ["render_html", "run", "sweep", "phase"] + list(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY[name]
+    module = importlib.import_module(module_name, __name__)
+    value = module if attribute is None else getattr(module, attribute)
+    # importing .raster set the attribute to the module, replace it
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
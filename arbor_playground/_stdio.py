@@ -0,0 +1,107 @@
+"""Batched replacements for ``sys.stdout`` and ``sys.stderr``.
+
+Pyodide's default streams call back into JavaScript once for every line.
+Scripts that print a row per cell or per time step then spend most of
+their time crossing the Python/JS boundary. These streams collect writes
+in one shared buffer, which keeps stdout and stderr correctly interleaved,
+and hand it over as a few large chunks.
+
+Only bursts are batched: a line following a quiet period is handed over
+at once, so a ``print`` right before a long blocking call (like
+``sim.run``) shows up before it. Text still pending is handed over by a
+timer of the worker once the script yields.
+"""
+
+import io
+import time
+
+__all__ = ["install", "flush"]
+
+
+class _Output:
+    def __init__(self, write, limit, interval, schedule):
+        self._write = write
+        self._limit = limit
+        self._interval = interval
+        self._schedule = schedule
+        self._scheduled = False
+        self._chunks = []
+        self._stream = None
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self._last_line = self._last_flush
+
+    def add(self, stream, text):
+        if stream != self._stream:
+            self.flush()
+            self._stream = stream
+        self._chunks.append(text)
+        self._size += len(text)
+        now = time.monotonic()
+        quiet = False
+        if "\n" in text:
+            quiet = now - self._last_line >= self._interval
+            self._last_line = now
+        if quiet or self._size >= self._limit or now - self._last_flush >= self._interval:
+            self.flush(now)
+        elif not self._scheduled and self._schedule is not None:
+            self._scheduled = True
+            self._schedule(self._interval)
+
+    def flush(self, now=None):
+        self._last_flush = time.monotonic() if now is None else now
+        self._scheduled = False
+        if not self._chunks:
+            return
+        text = "".join(self._chunks)
+        self._chunks.clear()
+        self._size = 0
+        self._write(self._stream, text)
+
+
+class _Stream(io.TextIOBase):
+    def __init__(self, output, name):
+        self._output = output
+        self._name = name
+
+    @property
+    def name(self):
+        return f"<{self._name}>"
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            self._output.add(self._name, text)
+        return len(text)
+
+    def flush(self):
+        self._output.flush()
+
+
+_output = None
+
+
+def install(write, limit=1 << 16, interval=0.05, schedule=None):
+    """Replace ``sys.stdout`` and ``sys.stderr`` with batched streams.
+
+    ``write(stream, text)`` is called with ``stream`` either ``"stdout"`` or
+    ``"stderr"`` once at least ``limit`` characters are pending, when
+    ``interval`` seconds have passed since the previous hand-over, or for
+    the first line after ``interval`` seconds without one. When text is
+    left pending, ``schedule(interval)`` is called to have :func:`flush`
+    called later.
+    """
+    import sys
+
+    global _output
+    _output = _Output(write, limit, interval, schedule)
+    sys.stdout = _Stream(_output, "stdout")
+    sys.stderr = _Stream(_output, "stderr")
+
+
+def flush():
+    """Hand over any pending output."""
+    if _output is not None:
+        _output.flush()
@@ -0,0 +1,112 @@
+"""Memoized cell descriptions for recipes.
+
+Recipes are asked for ``cell_description(gid)`` once per cell, and most
+build the segment tree, label dictionary and decor from scratch every
+time, parsing the same s-expressions over and over, even when all cells
+are identical. Decorating the builder with :func:`template` builds each
+distinct cell once and hands out the same description afterwards::
+
+    @cell_templates.template
+    def make_cell(radius, dend_length):
+        ...
+        return arbor.cable_cell(tree, decor, labels)
+
+    def cell_description(self, gid):
+        return make_cell(6, 50)
+
+Cells are keyed by the builder and its arguments, so only pass what the
+cell actually depends on (not the gid, unless it matters). Dicts, lists
+and NumPy arrays are accepted as arguments. The cache is shared by all
+builders and keeps the most recently used ``maxsize`` cells. The worker
+empties it at the start of every run.
+"""
+
+import collections
+import functools
+
+import numpy as np
+
+__all__ = ["TemplateCache", "template", "cache_info", "clear"]
+
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def _freeze(value):
+    # hashable stand-in for an argument, equal arguments give equal keys
+    if isinstance(value, dict):
+        # by repr, keys of different types don't compare
+        items = sorted(value.items(), key=lambda item: repr(item[0]))
+        return ("dict", tuple((k, _freeze(v)) for k, v in items))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return ("set", frozenset(_freeze(v) for v in value))
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class TemplateCache:
+    """Least recently used cache of built cells."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cells = collections.OrderedDict()
+
+    def get(self, key, build):
+        """The cell stored under ``key``, calling ``build()`` to make it if needed."""
+        try:
+            cell = self._cells[key]
+        except KeyError:
+            pass
+        else:
+            self._cells.move_to_end(key)
+            self.hits += 1
+            return cell
+        self.misses += 1
+        cell = build()
+        self._cells[key] = cell
+        if len(self._cells) > self.maxsize:
+            self._cells.popitem(last=False)
+        return cell
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._cells))
+
+    def clear(self):
+        self._cells.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+_cache = TemplateCache()
+
+
+def template(builder=None, *, cache=None):
+    """Decorate a cell builder so equal arguments give the same, shared cell."""
+    if builder is None:
+        return functools.partial(template, cache=cache)
+    store = _cache if cache is None else cache
+
+    @functools.wraps(builder)
+    def cached(*args, **kwargs):
+        # the builder itself is part of the key, a redefinition doesn't see old cells
+        key = (builder, _freeze(args), _freeze(kwargs))
+        return store.get(key, lambda: builder(*args, **kwargs))
+
+    cached.cache = store
+    return cached
+
+
+def cache_info():
+    """Hits, misses and size of the shared cache."""
+    return _cache.info()
+
+
+def clear():
+    """Empty the shared cache."""
+    _cache.clear()
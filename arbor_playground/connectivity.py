@@ -0,0 +1,195 @@
+"""Network connectivity generated up front, stored per target gid.
+
+Recipes are asked for the connections of one gid at a time. Sampling
+them there (shuffling the whole population per gid) makes building a
+network quadratic in its size. The generators here draw all connections
+at once with vectorized NumPy, reproducibly from a seed, and store them
+as a compressed sparse row table. ``connections_on`` then only slices a
+row::
+
+    exc = connectivity.fixed_indegree(ncells, 20, sources=(0, nexc), seed=42)
+
+    def connections_on(self, gid):
+        return [arbor.connection((int(src), "src"), "tgt", w, d)
+                for src in exc.row(gid)]
+"""
+
+import numpy as np
+
+__all__ = [
+    "Connectivity",
+    "fixed_indegree",
+    "fixed_probability",
+    "clustered",
+    "bridge",
+]
+
+# upper bound on the number of random keys drawn at once
+_CHUNK = 1 << 22
+
+
+class Connectivity:
+    """Incoming connections of ``n`` targets in compressed sparse row form.
+
+    The sources of target ``gid`` are ``sources[indptr[gid]:indptr[gid + 1]]``.
+    Extra per-connection columns (weights, delays, label indices) can be
+    attached with :meth:`add` and are sliced the same way.
+    """
+
+    def __init__(self, indptr, sources):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.columns = {}
+        if self.indptr[-1] != len(self.sources):
+            raise ValueError("indptr doesn't match the number of sources")
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.sources)
+
+    def in_degree(self):
+        return np.diff(self.indptr)
+
+    def add(self, name, values):
+        """Attach a per-connection column, in the order of ``sources``."""
+        values = np.asarray(values)
+        if values.shape[:1] != (self.num_edges,):
+            raise ValueError(f"column {name!r} needs one value per connection")
+        self.columns[name] = values
+        return self
+
+    def row(self, gid, column=None):
+        """Sources of ``gid``, or its values of ``column``."""
+        data = self.sources if column is None else self.columns[column]
+        return data[self.indptr[gid] : self.indptr[gid + 1]]
+
+    @classmethod
+    def from_lists(cls, rows):
+        """Build from one sequence of sources per target."""
+        degrees = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        indptr = np.concatenate([[0], np.cumsum(degrees)])
+        sources = np.concatenate([np.asarray(r, dtype=np.int64) for r in rows]) if rows else []
+        return cls(indptr, sources)
+
+
+def _targets(n_targets, target_offset):
+    return target_offset + np.arange(n_targets)
+
+
+def _self_columns(targets, start, end):
+    # column of each target within the source range, -1 if it isn't in there
+    return np.where((targets >= start) & (targets < end), targets - start, -1)
+
+
+def _chunks(n_rows, width):
+    step = max(1, _CHUNK // max(1, width))
+    for lo in range(0, n_rows, step):
+        yield lo, min(n_rows, lo + step)
+
+
+def _distinct(rng, available, k):
+    # per row r, k sorted distinct draws from range(available[r]): redraw
+    # duplicates until there are none, which is quick while 2 k <= available
+    picked = (rng.random((len(available), k)) * available[:, None]).astype(np.int64)
+    todo = np.arange(len(available))
+    while len(todo) > 0:
+        sub = np.sort(picked[todo], axis=1)
+        duplicate = np.zeros(sub.shape, dtype=bool)
+        duplicate[:, 1:] = sub[:, 1:] == sub[:, :-1]
+        rows, cols = np.nonzero(duplicate)
+        sub[rows, cols] = (rng.random(len(rows)) * available[todo][rows]).astype(np.int64)
+        picked[todo] = sub
+        todo = todo[np.unique(rows)]
+    return picked
+
+
+def fixed_indegree(n_targets, k, sources, seed=None, autapses=False, target_offset=0):
+    """Every target gets ``k`` distinct sources drawn from ``range(*sources)``.
+
+    Targets are gids ``target_offset .. target_offset + n_targets - 1``. A
+    target is not connected to itself unless ``autapses`` is set. The work
+    is proportional to ``n_targets * k``, not to the number of sources.
+    """
+    start, end = sources
+    width = end - start
+    rng = np.random.default_rng(seed)
+    targets = _targets(n_targets, target_offset)
+    exclude = np.full(n_targets, -1) if autapses else _self_columns(targets, start, end)
+    available = width - (exclude >= 0)
+    if k > available.min(initial=width):
+        raise ValueError(f"can't draw {k} distinct sources from {width} cells")
+    # drawing most of the sources, random keys for all of them cost about the same
+    dense = 2 * k > available.min(initial=width)
+    rows = []
+    for lo, hi in _chunks(n_targets, width if dense else k):
+        if dense:
+            keys = rng.random((hi - lo, width))
+            excluded = np.nonzero(exclude[lo:hi] >= 0)[0]
+            keys[excluded, exclude[lo:hi][excluded]] = np.inf
+            if k < width:
+                picked = np.argpartition(keys, k - 1, axis=1)[:, :k]
+            else:
+                picked = np.argsort(keys, axis=1)[:, :k]
+            rows.append(np.sort(picked, axis=1))
+        else:
+            picked = _distinct(rng, available[lo:hi], k)
+            # skip over the target itself, keeps the rows sorted and distinct
+            skip = np.where(exclude[lo:hi] >= 0, exclude[lo:hi], width)
+            rows.append(picked + (picked >= skip[:, None]))
+    picked = np.concatenate(rows) if rows else np.empty((0, k), dtype=np.int64)
+    indptr = np.arange(n_targets + 1, dtype=np.int64) * k
+    return Connectivity(indptr, start + picked.ravel())
+
+
+def fixed_probability(n_targets, p, sources, seed=None, autapses=False, target_offset=0):
+    """Every source in ``range(*sources)`` connects to every target with probability ``p``."""
+    start, end = sources
+    width = end - start
+    rng = np.random.default_rng(seed)
+    targets = _targets(n_targets, target_offset)
+    exclude = np.full(n_targets, -1) if autapses else _self_columns(targets, start, end)
+    degrees = []
+    picked = []
+    for lo, hi in _chunks(n_targets, width):
+        mask = rng.random((hi - lo, width)) < p
+        excluded = np.nonzero(exclude[lo:hi] >= 0)[0]
+        mask[excluded, exclude[lo:hi][excluded]] = False
+        degrees.append(mask.sum(axis=1))
+        picked.append(np.nonzero(mask)[1])
+    degrees = np.concatenate(degrees) if degrees else np.empty(0, dtype=np.int64)
+    indptr = np.concatenate([[0], np.cumsum(degrees)])
+    sources = start + (np.concatenate(picked) if picked else np.empty(0, dtype=np.int64))
+    return Connectivity(indptr, sources)
+
+
+def clustered(n, cluster_size, degree, seed=None, bridge_fraction=0.0):
+    """Cells grouped in clusters of consecutive gids, connected within their cluster.
+
+    Every cell gets a number of connections drawn uniformly from
+    ``range(*degree)``, each to a random other member of its cluster (the
+    same source can be drawn twice). A ``bridge_fraction`` of the cells are
+    bridges, which draw their sources from the whole network instead.
+    """
+    lo_degree, hi_degree = degree
+    rng = np.random.default_rng(seed)
+    gids = np.arange(n)
+    degrees = rng.integers(lo_degree, hi_degree, n)
+    is_bridge = rng.random(n) < bridge_fraction
+    targets = np.repeat(gids, degrees)
+    # a draw from the other cells of the group, shifted past the target itself
+    group_start = np.where(is_bridge, 0, gids // cluster_size * cluster_size)[targets]
+    group_size = np.where(is_bridge, n, np.minimum(cluster_size, n - gids // cluster_size * cluster_size))[targets]
+    other = group_start + (rng.random(len(targets)) * (group_size - 1)).astype(np.int64)
+    other += other >= targets
+    keep = group_size > 1
+    targets, other = targets[keep], other[keep]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(targets, minlength=n))])
+    return Connectivity(indptr, other)
+
+
+def bridge(n, cluster_size, degree, fraction, seed=None):
+    """:func:`clustered` with a ``fraction`` of bridge cells linking the clusters."""
+    return clustered(n, cluster_size, degree, seed=seed, bridge_fraction=fraction)
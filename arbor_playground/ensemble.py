@@ -0,0 +1,109 @@
+"""Many variants of a single-cell model in one simulation.
+
+Sweeping a parameter by building a recipe and a simulation per value
+pays the simulation setup every time. An :class:`Ensemble` instead makes
+every variant a separate, unconnected cell (gid ``i`` is variant ``i``)
+of one simulation, which is set up and run once::
+
+    ens = arbor_playground.Ensemble(single_recipe, ensemble.grid(dT=np.arange(-20, 20, 0.5)))
+    weights = ens.sample(4, arbor.regular_schedule(0.1))
+    await arbor_playground.run(ens.simulation, tfinal=600)
+    for params, data in zip(ens.params, ens.samples(weights)):
+        ...
+
+``factory`` builds the recipe of one variant. It is called with the
+parameters as keyword arguments if they are a dict, else with the
+parameters as its only argument. Each recipe has to describe exactly one
+cell without connections; cell, probes and event generators of gid 0
+become those of the variant's gid. Global properties are taken from the
+first variant.
+"""
+
+import itertools
+
+import arbor
+import numpy as np
+
+__all__ = ["Ensemble", "EnsembleRecipe", "grid"]
+
+
+def grid(**axes):
+    """Parameter dicts for every combination of the given values."""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+class EnsembleRecipe(arbor.recipe):
+    """Recipe with the single cell of ``variants[gid]`` as cell ``gid``."""
+
+    def __init__(self, variants):
+        arbor.recipe.__init__(self)
+        self.variants = list(variants)
+        if not self.variants:
+            raise ValueError("an ensemble needs at least one variant")
+        for variant in self.variants:
+            if variant.num_cells() != 1:
+                raise ValueError("ensemble variants must be single-cell recipes")
+
+    def num_cells(self):
+        return len(self.variants)
+
+    def cell_kind(self, gid):
+        return self.variants[gid].cell_kind(0)
+
+    def cell_description(self, gid):
+        return self.variants[gid].cell_description(0)
+
+    def connections_on(self, gid):
+        if self.variants[gid].connections_on(0):
+            raise ValueError("ensemble variants can't have connections")
+        return []
+
+    def event_generators(self, gid):
+        return self.variants[gid].event_generators(0)
+
+    def probes(self, gid):
+        return self.variants[gid].probes(0)
+
+    def global_properties(self, kind):
+        return self.variants[0].global_properties(kind)
+
+
+class Ensemble:
+    """One simulation running a variant of ``factory`` per entry of ``params``."""
+
+    def __init__(self, factory, params, context=None):
+        self.params = list(params)
+        variants = [factory(**p) if isinstance(p, dict) else factory(p) for p in self.params]
+        self.recipe = EnsembleRecipe(variants)
+        if context is None:
+            self.simulation = arbor.simulation(self.recipe)
+        else:
+            self.simulation = arbor.simulation(self.recipe, context)
+
+    def __len__(self):
+        return len(self.params)
+
+    def sample(self, probe, schedule, policy=None):
+        """Sample probe number ``probe`` of every variant, returns the handles."""
+        args = () if policy is None else (policy,)
+        return [self.simulation.sample((gid, probe), schedule, *args) for gid in range(len(self))]
+
+    def samples(self, handles):
+        """Per variant the sample array of ``handles`` from :meth:`sample`."""
+        result = []
+        for handle in handles:
+            recorded = self.simulation.samples(handle)
+            result.append(recorded[0][0] if recorded else np.empty((0, 2)))
+        return result
+
+    def record_spikes(self):
+        self.simulation.record(arbor.spike_recording.all)
+
+    def spikes(self):
+        """Per variant the array of its spike times, after :meth:`record_spikes`."""
+        spikes = self.simulation.spikes()
+        gids = spikes["source"]["gid"]
+        order = np.argsort(gids, kind="stable")
+        counts = np.bincount(gids, minlength=len(self))
+        return np.split(spikes["time"][order], np.cumsum(counts)[:-1])
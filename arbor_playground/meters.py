@@ -0,0 +1,156 @@
+"""Automatic arbor meters.
+
+:func:`install` wraps ``arbor.simulation`` (construction and ``run``),
+``arbor.single_cell_model.run`` and ``arbor.partition_load_balance``, so
+any script gets ``arbor.meter_manager`` checkpoints around them without
+changes. Time in between counts as ``script``. The WebAssembly heap size
+is sampled at every checkpoint, it only ever grows. The Meters toggle of
+the page installs it before a run, scripts can also call it themselves::
+
+    arbor_playground.meters.install()
+
+When the run ends the worker calls :func:`publish`, which sends
+:func:`report` to the page, where it is shown next to the console and can
+be copied as JSON.
+"""
+
+import json
+import time
+
+import arbor
+import arbor_playground_js
+
+__all__ = ["install", "uninstall", "installed", "report", "publish"]
+
+_originals = {}
+_state = None
+
+
+class _Meters:
+    def __init__(self):
+        # a context of its own, checkpoints must all use the same one
+        self.context = arbor.context()
+        self.manager = arbor.meter_manager()
+        self.heap = [_heap_size()]
+        self.started = time.time()
+        self.depth = 0
+        self.manager.start(self.context)
+
+    def checkpoint(self, name):
+        self.manager.checkpoint(name, self.context)
+        self.heap.append(_heap_size())
+
+    def phase(self, name, fn, *args, **kwargs):
+        if self.depth > 0:  # part of the enclosing phase
+            return fn(*args, **kwargs)
+        self.checkpoint("script")
+        self.depth += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.depth -= 1
+            self.checkpoint(name)
+
+
+def _heap_size():
+    return int(arbor_playground_js.heap_size())
+
+
+def _metered(name, fn):
+    def metered(*args, **kwargs):
+        if _state is None:
+            return fn(*args, **kwargs)
+        return _state.phase(name, fn, *args, **kwargs)
+    metered.__name__ = fn.__name__
+    metered.__doc__ = fn.__doc__
+    return metered
+
+
+def install():
+    """Start metering, wrapping the arbor calls. Does nothing if already installed."""
+    global _state
+    if _state is not None:
+        return
+    simulation = arbor.simulation
+    single_cell_model = arbor.single_cell_model
+    _originals.update(
+        simulation=simulation,
+        single_cell_model=single_cell_model,
+        partition_load_balance=arbor.partition_load_balance,
+    )
+
+    class metered_simulation(simulation):
+        __doc__ = simulation.__doc__
+
+        def __init__(self, *args, **kwargs):
+            _metered("simulation", super().__init__)(*args, **kwargs)
+
+        def run(self, *args, **kwargs):
+            return _metered("simulation.run", super().run)(*args, **kwargs)
+
+    class metered_single_cell_model(single_cell_model):
+        __doc__ = single_cell_model.__doc__
+
+        def run(self, *args, **kwargs):
+            return _metered("single_cell_model.run", super().run)(*args, **kwargs)
+
+    metered_simulation.__name__ = "simulation"
+    metered_single_cell_model.__name__ = "single_cell_model"
+    arbor.simulation = metered_simulation
+    arbor.single_cell_model = metered_single_cell_model
+    arbor.partition_load_balance = _metered("partition_load_balance", arbor.partition_load_balance)
+    _state = _Meters()
+
+
+def uninstall():
+    """Restore the arbor calls and stop metering."""
+    global _state
+    for name, value in _originals.items():
+        setattr(arbor, name, value)
+    _originals.clear()
+    _state = None
+
+
+def installed():
+    """Whether :func:`install` is in effect."""
+    return _state is not None
+
+
+def report():
+    """The checkpoints so far, by name in order of first appearance.
+
+    A dict with ``phases``, a list of ``{name, calls, seconds, heap_before,
+    heap_after}`` (heap in bytes, before the first and after the last
+    call), ``seconds`` in total and the current ``heap_bytes``. None if
+    not installed.
+    """
+    if _state is None:
+        return None
+    names = list(_state.manager.checkpoint_names)
+    times = list(_state.manager.times)
+    phases = {}
+    for i, (name, seconds) in enumerate(zip(names, times)):
+        if name not in phases:
+            phases[name] = {"name": name, "calls": 0, "seconds": 0.0, "heap_before": _state.heap[i]}
+        phase = phases[name]
+        phase["calls"] += 1
+        phase["seconds"] += seconds
+        phase["heap_after"] = _state.heap[i + 1]
+    return {
+        "started": _state.started,
+        "checkpoints": len(names),
+        "seconds": sum(times),
+        "heap_bytes": _heap_size(),
+        "phases": list(phases.values()),
+    }
+
+
+def publish():
+    """Send the report to the page and uninstall. Does nothing if not installed."""
+    if _state is None:
+        return
+    _state.checkpoint("script")
+    try:
+        arbor_playground_js.meter_report(json.dumps(report()))
+    finally:
+        uninstall()
@@ -0,0 +1,198 @@
+"""Notebook style cells.
+
+A script with ``# %%`` marker lines is split into cells, which share one
+namespace that is kept between runs. A run only executes the cells that
+changed since they last ran, and the cells depending on those::
+
+    # %% build and run the simulation
+    sim = arbor.simulation(recipe)
+    sim.run(1000)
+
+    # %% plot, edit and run again without simulating again
+    arbor_playground.raster(sim)
+
+A cell depends on the latest earlier cell defining (assigning, importing,
+or changing an attribute or item of, or calling a method on) each name
+it uses. Calling functions of imported modules, like ``arbor.simulation``,
+doesn't count as changing them. Its key is a hash of its source and the
+keys of the cells it depends on, so an edit changes the key of every cell
+downstream. Cells whose key ran successfully before are skipped.
+
+Scripts without markers run as a whole in a fresh namespace, like
+before. The worker runs every script through :func:`run`.
+"""
+
+import ast
+import hashlib
+import json
+import re
+
+from pyodide.code import eval_code_async
+
+import arbor_playground_js
+
+from .timeline import phase
+
+__all__ = ["run", "reset", "split", "summary"]
+
+MARKER = re.compile(r"^#\s*%%")
+
+_namespace = None
+_done = set()  # keys of the cells that ran in _namespace
+_summary = None
+
+
+class Cell:
+    def __init__(self, index, line, source):
+        self.index = index
+        self.line = line  # of the first line in the script, from 0
+        self.source = source
+        self.defined, self.changed, self.imported, self.used = _names(source)
+        self.key = None
+
+
+def split(code):
+    """The cells of code, None if it has no ``# %%`` markers."""
+    lines = code.split("\n")
+    starts = [i for i, line in enumerate(lines) if MARKER.match(line)]
+    if not starts:
+        return None
+    if any(line.strip() for line in lines[:starts[0]]):
+        starts.insert(0, 0)
+    bounds = zip(starts, starts[1:] + [len(lines)])
+    return [Cell(k, start, "\n".join(lines[start:end])) for k, (start, end) in enumerate(bounds)]
+
+
+def reset():
+    """Forget the namespace, the next run executes every cell."""
+    global _namespace
+    _namespace = None
+    _done.clear()
+
+
+async def run(code, reset_cells=False):
+    """Run the cells of code that changed, or all of a script without cells."""
+    global _namespace, _summary
+    cells = split(code)
+    if cells is None or reset_cells:
+        reset()
+    if cells is None:
+        _summary = None
+        await eval_code_async(code, {"__name__": "__main__"}, filename="main.py")
+        return
+    if _namespace is None:
+        _namespace = {"__name__": "__main__"}
+    _link(cells)
+    keys = {cell.key for cell in cells}
+    _done.intersection_update(keys)
+    skipped = [cell.index for cell in cells if cell.key in _done]
+    ran = []
+    _summary = {"count": len(cells), "ran": ran, "skipped": skipped}
+    if skipped:
+        print("Unchanged cells not run: " + ", ".join(str(i + 1) for i in skipped))
+    for cell in cells:
+        if cell.key in _done:
+            continue
+        arbor_playground_js.begin_cell(cell.index)
+        ran.append(cell.index)
+        with phase(f"cell {cell.index + 1}"):
+            # padded, so line numbers in tracebacks are those of the editor
+            await eval_code_async("\n" * cell.line + cell.source, _namespace, filename="main.py")
+        _done.add(cell.key)
+
+
+def summary():
+    """JSON of ``{count, ran, skipped}`` (cell indices) of the last run, null without cells."""
+    return json.dumps(_summary)
+
+
+def _link(cells):
+    # key of every cell, from its source and the keys of its dependencies
+    modules = set().union(*(cell.imported for cell in cells))
+    for cell in cells:
+        cell.defined |= cell.changed - modules
+    for k, cell in enumerate(cells):
+        depends = set()
+        for name in cell.used:
+            for earlier in reversed(cells[:k]):
+                if name in earlier.defined or "*" in earlier.defined:
+                    depends.add(earlier.key)
+                    break
+        digest = hashlib.sha1(cell.source.encode())
+        for key in sorted(depends):
+            digest.update(key.encode())
+        cell.key = digest.hexdigest()
+
+
+def _names(source):
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return set(), set(), set(), set()  # running it reports the error
+    visitor = _Names()
+    visitor.visit(tree)
+    return visitor.defined, visitor.changed, visitor.imported, visitor.used
+
+
+class _Names(ast.NodeVisitor):
+    """Names a cell defines, changes, imports and uses, at its top level."""
+
+    def __init__(self):
+        self.defined = set()
+        self.changed = set()
+        self.imported = set()
+        self.used = set()
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.used.add(node.id)
+        else:
+            self.defined.add(node.id)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imported.add(alias.asname or alias.name.split(".")[0])
+        self.defined |= self.imported
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            self.defined.add(alias.asname or alias.name)
+
+    def _function(self, node):
+        self.defined.add(node.name)
+        for child in node.decorator_list + getattr(node, "bases", []):
+            self.visit(child)
+        if hasattr(node, "args"):
+            for default in node.args.defaults + node.args.kw_defaults:
+                if default is not None:
+                    self.visit(default)
+        # names in the body are local or looked up when it is called
+        body = _Names()
+        for child in node.body:
+            body.visit(child)
+        self.used |= body.used
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _function
+
+    def _changes(self, target):
+        # x.a = ..., x[i] = ... and x.f() may change the object bound to x
+        while isinstance(target, (ast.Attribute, ast.Subscript)):
+            target = target.value
+        if isinstance(target, ast.Name):
+            self.changed.add(target.id)
+            self.used.add(target.id)
+
+    def visit_Attribute(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            self._changes(node)
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            self._changes(node)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Attribute):
+            self._changes(node.func.value)
+        self.generic_visit(node)
@@ -0,0 +1,74 @@
+"""Figures as data instead of html.
+
+``fig.to_html()`` writes every sample as decimal text into one big html
+string, which the page then has to parse and build from scratch.
+:func:`plot` sends the figure as plain objects instead, with NumPy arrays
+converted to JavaScript typed arrays (a binary copy of the buffer), and
+the page updates charts it already shows with ``Plotly.react``.
+"""
+
+import datetime
+
+import numpy as np
+from js import Object
+from pyodide.ffi import to_js
+
+import arbor_playground_js
+
+from .timeline import phase
+
+__all__ = ["plot"]
+
+
+def plot(fig, id=None):
+    """Show a figure in the output pane.
+
+    ``fig`` is a plotly figure, a ``{"data": [...], "layout": {...}}`` dict or
+    a list of trace dicts. Trace data can be NumPy arrays.
+
+    Every call without an ``id`` gets its own chart, numbered in call order,
+    so re-running a script updates its charts in place. Charts not plotted
+    again during a run are removed when it finishes. Calls with the same
+    ``id`` update a single chart.
+    """
+    with phase("figure build"):
+        if hasattr(fig, "to_dict"):
+            fig = fig.to_dict()
+        elif isinstance(fig, (list, tuple)):
+            fig = {"data": list(fig)}
+        data = [_convert(trace) for trace in fig.get("data", [])]
+        layout = _convert(fig.get("layout", {}))
+        data = to_js(data, dict_converter=Object.fromEntries, create_pyproxies=False)
+        layout = to_js(layout, dict_converter=Object.fromEntries, create_pyproxies=False)
+    arbor_playground_js.plot(None if id is None else str(id), data, layout)
+
+
+def _convert(value):
+    # Reduce to what to_js turns into plain JavaScript values. Numeric
+    # arrays stay arrays, to_js copies them into typed arrays.
+    if isinstance(value, dict):
+        return {str(k): _convert(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_convert(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _convert_array(value)
+    if isinstance(value, np.generic):
+        return _convert(value.item())
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if hasattr(value, "to_numpy"):  # pandas Series and Index
+        return _convert_array(value.to_numpy())
+    return value
+
+
+def _convert_array(array):
+    if array.dtype.kind in "iuf":
+        if array.ndim == 1:
+            if array.dtype.itemsize == 8 and array.dtype.kind != "f":
+                # 64 bit integers would become BigInt64Array, which plotly can't use
+                array = array.astype(np.float64)
+            return np.ascontiguousarray(array)
+        return [_convert_array(row) for row in array]
+    if array.dtype.kind == "M":
+        return np.datetime_as_string(array).tolist()
+    return [_convert(v) for v in array.tolist()]
@@ -0,0 +1,168 @@
+"""Profile runs.
+
+The Profile button runs the script under :mod:`cProfile`, via
+:func:`profiled`. Afterwards the output pane shows a flame graph of the
+run (a plotly icicle chart, callers above their callees) and the console
+lists the recipe callbacks arbor made, which it calls once per gid, next
+to the functions that took the most time themselves. Callbacks are the
+methods of ``arbor.recipe`` subclasses, calls between them (like those
+forwarded by :class:`~arbor_playground.ensemble.EnsembleRecipe`) only
+count for the outermost one.
+
+Time spent in arbor's C++ shows up under builtin entries like
+``<method 'run' of 'arbor._arbor.simulation' objects>``, except while
+constructing objects, which counts towards the caller. cProfile slows
+down Python code with many small calls, compare with a normal run.
+"""
+
+import cProfile
+import collections
+import os
+import pstats
+import sys
+
+import arbor
+
+from .plotting import plot
+
+__all__ = ["profiled", "RECIPE_CALLBACKS"]
+
+RECIPE_CALLBACKS = [
+    "cell_kind",
+    "cell_description",
+    "connections_on",
+    "gap_junctions_on",
+    "event_generators",
+    "probes",
+]
+
+# Flame graph nodes below this fraction of the total are left out
+MIN_FRACTION = 0.002
+MAX_DEPTH = 40
+
+
+async def profiled(coroutine):
+    """Await ``coroutine`` under cProfile, then show the report."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return await coroutine
+    finally:
+        profiler.disable()
+        report(pstats.Stats(profiler))
+
+
+def report(stats, top=15):
+    """Print the recipe callbacks and the ``top`` functions, plot the flame graph."""
+    total = stats.total_tt
+    print(f"\nProfile: {total:.3f} s")
+    callbacks = recipe_callbacks(stats)
+    if callbacks:
+        print("Recipe callbacks        calls   cumtime   per call")
+        for name, (calls, cumtime) in callbacks.items():
+            print(f"  {name:<20} {calls:>7} {cumtime:>8.3f}s {1e6 * cumtime / calls:>8.1f}us")
+        callback_time = sum(cumtime for _, cumtime in callbacks.values())
+        share = callback_time / total if total > 0 else 0.0
+        print(f"  {'total':<20} {'':>7} {callback_time:>8.3f}s ({100 * share:.0f}% of the profiled time)")
+    stats.stream = sys.stdout
+    stats.strip_dirs().sort_stats("tottime").print_stats(top)
+    plot(flame_graph(stats), id="profile")
+
+
+def recipe_callbacks(stats):
+    """``{name: (calls, cumulative seconds)}`` of the recipe callbacks that were called."""
+    callbacks = _callback_functions()
+    totals = collections.defaultdict(lambda: [0, 0.0])
+    for func, (_, calls, _, cumtime, callers) in stats.stats.items():
+        if func not in callbacks:
+            continue
+        # leave out calls from other callbacks, arbor made the outer one
+        for caller, (_, caller_calls, _, caller_cumtime) in callers.items():
+            if caller in callbacks:
+                calls -= caller_calls
+                cumtime -= caller_cumtime
+        name = func[2]
+        totals[name][0] += calls
+        totals[name][1] += max(cumtime, 0.0)
+    return {name: tuple(totals[name]) for name in RECIPE_CALLBACKS if totals[name][0] > 0}
+
+
+def _callback_functions():
+    # stats keys of the RECIPE_CALLBACKS methods of all arbor.recipe subclasses
+    functions = set()
+    classes = [arbor.recipe]
+    while classes:
+        for cls in classes.pop().__subclasses__():
+            classes.append(cls)
+            for name in RECIPE_CALLBACKS:
+                code = getattr(cls.__dict__.get(name), "__code__", None)
+                if code is not None:
+                    functions.add((code.co_filename, code.co_firstlineno, code.co_name))
+    return functions
+
+
+def flame_graph(stats):
+    """Icicle figure of stats.
+
+    cProfile only keeps caller/callee pairs, not whole stacks, so the time
+    of a function called from several places is split over them in
+    proportion to the time each caller spent in it. Time no caller
+    accounts for, like that of frames entered before profiling started or
+    resumed coroutines such as the script itself, starts at the top.
+    """
+    callees = collections.defaultdict(list)
+    roots = {}
+    for func, (_, _, _, cumtime, callers) in stats.stats.items():
+        for caller, (_, _, _, edge_cumtime) in callers.items():
+            callees[caller].append((func, edge_cumtime))
+        unattributed = cumtime - sum(edge[3] for edge in callers.values())
+        if unattributed > 0:
+            roots[func] = unattributed
+    total = sum(roots.values())
+    ids, labels, parents, values = ["all"], ["all"], [""], [total]
+    min_value = MIN_FRACTION * total
+
+    def add(func, value, parent, path):
+        node = f"{parent}/{len(ids)}"
+        ids.append(node)
+        labels.append(_label(func))
+        parents.append(parent)
+        values.append(value)
+        cumtime = stats.stats[func][3]
+        if len(path) >= MAX_DEPTH or cumtime <= 0:
+            return
+        children = [
+            (callee, edge_cumtime * value / cumtime)
+            for callee, edge_cumtime in callees[func]
+            if callee not in path
+        ]
+        # branchvalues="total" needs children to fit in their parent
+        covered = sum(v for _, v in children)
+        scale = min(1.0, 0.999 * value / covered) if covered > 0 else 1.0
+        for callee, v in sorted(children, key=lambda c: -c[1]):
+            if v * scale >= min_value:
+                add(callee, v * scale, node, path | {callee})
+
+    for func, value in sorted(roots.items(), key=lambda r: -r[1]):
+        if value >= min_value:
+            add(func, value, "all", frozenset([func]))
+    return {
+        "data": [{
+            "type": "icicle",
+            "ids": ids,
+            "labels": labels,
+            "parents": parents,
+            "values": values,
+            "branchvalues": "total",
+            "tiling": {"orientation": "v", "flip": "y"},
+            "hovertemplate": "%{label}<br>%{value:.4f} s<extra></extra>",
+        }],
+        "layout": {"title": "Profile", "margin": {"t": 40, "l": 0, "r": 0, "b": 0}},
+    }
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":  # builtin
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
@@ -0,0 +1,80 @@
+"""Spike rasters straight from ``sim.spikes()``.
+
+Turning the structured spike array into Python tuples and a DataFrame
+first costs seconds and a lot of memory once a network produces a few
+hundred thousand spikes, and an SVG scatter can't draw that many points
+anyway. :func:`raster` takes the ``source.gid`` and ``time`` columns as
+NumPy arrays, sends them as typed arrays and draws them with WebGL
+(``scattergl``), which stays interactive at a million spikes::
+
+    sim.record(arbor.spike_recording.all)
+    await arbor_playground.run(sim, tfinal=1000)
+    arbor_playground.raster(sim, populations={"exc": (0, 400), "inh": (400, 500)})
+"""
+
+import numpy as np
+
+from .plotting import plot
+
+__all__ = ["raster"]
+
+# plotly's default colour sequence
+COLORS = [
+    "#636efa", "#ef553b", "#00cc96", "#ab63fa", "#ffa15a",
+    "#19d3f3", "#ff6692", "#b6e880", "#ff97ff", "#fecb52",
+]
+
+
+def _mask(gids, members):
+    # members: a (start, end) gid range, a range, or a sequence of gids
+    if isinstance(members, range) and members.step == 1:
+        members = (members.start, members.stop)
+    if isinstance(members, tuple) and len(members) == 2:
+        start, end = members
+        return (gids >= start) & (gids < end)
+    return np.isin(gids, np.asarray(members))
+
+
+def raster(spikes, populations=None, id=None, title="Spikes", marker_size=2):
+    """Plot spikes as time against gid.
+
+    ``spikes`` is a simulation with spike recording enabled, or the array
+    returned by its ``spikes()``. ``populations`` maps names to the gids of
+    each population, as a ``(start, end)`` range or a sequence of gids,
+    and gives every population its own colour and legend entry. Spikes of
+    gids in none of them are not shown. ``id`` is passed on to :func:`plot`.
+    Returns the number of spikes plotted.
+    """
+    if hasattr(spikes, "spikes"):
+        spikes = spikes.spikes()
+    # field views, no copy until they are made contiguous for the page
+    gids = spikes["source"]["gid"]
+    times = spikes["time"]
+    if populations is None:
+        populations = {"spikes": None}
+    traces = []
+    shown = 0
+    for i, (name, members) in enumerate(populations.items()):
+        if members is None:
+            x, y = times, gids
+        else:
+            mask = _mask(gids, members)
+            x, y = times[mask], gids[mask]
+        shown += len(x)
+        traces.append({
+            "type": "scattergl",
+            "mode": "markers",
+            "name": name,
+            "x": np.ascontiguousarray(x),
+            "y": np.ascontiguousarray(y),
+            "marker": {"size": marker_size, "color": COLORS[i % len(COLORS)]},
+            "hovertemplate": "gid %{y}<br>%{x} ms<extra>" + str(name) + "</extra>",
+        })
+    layout = {
+        "title": title,
+        "xaxis": {"title": "Time (ms)"},
+        "yaxis": {"title": "Cell"},
+        "showlegend": len(traces) > 1,
+    }
+    plot({"data": traces, "layout": layout}, id=id)
+    return shown
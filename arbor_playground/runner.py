@@ -0,0 +1,79 @@
+"""Time-sliced simulation runs.
+
+``arbor.simulation.run`` is a single blocking call. :func:`run` advances a
+simulation in slices instead, reports progress to the page after each one
+and yields to the event loop in between, so the worker can react to the
+Stop button. It is a coroutine, use it with a top-level ``await``::
+
+    sim = arbor.simulation(recipe)
+    await arbor_playground.run(sim, tfinal=1000, dt=0.1)
+"""
+
+import asyncio
+import sys
+import time
+
+import arbor_playground_js
+
+from .timeline import phase
+
+__all__ = ["run"]
+
+
+async def run(sim, tfinal, dt=0.025, slice_ms=None, slice_wall=0.1, on_slice=None):
+    """Run ``sim`` until ``tfinal`` (ms) with time step ``dt`` (ms).
+
+    ``slice_ms`` fixes the amount of simulated time per slice. By default
+    the slice length adapts so that each slice takes about ``slice_wall``
+    seconds of wall-clock time. ``on_slice(t)`` is called after every
+    slice, see :class:`arbor_playground.StreamingRecorder`. Returns the
+    simulation time reached.
+
+    An ``arbor.single_cell_model`` can't be advanced piecewise, it is run
+    in one go.
+    """
+    with phase("simulation run"):
+        return await _run(sim, tfinal, dt, slice_ms, slice_wall, on_slice)
+
+
+async def _run(sim, tfinal, dt, slice_ms, slice_wall, on_slice):
+    import arbor
+
+    if isinstance(sim, arbor.single_cell_model):
+        _report(0, tfinal, 0.0)
+        await asyncio.sleep(0)
+        _check_abort()
+        sim.run(tfinal=tfinal, dt=dt)
+        _report(tfinal, tfinal, 0.0)
+        return tfinal
+
+    t = 0.0
+    step = slice_ms if slice_ms is not None else 10 * dt
+    wall_start = time.perf_counter()
+    while t < tfinal:
+        slice_start = time.perf_counter()
+        t_reached = sim.run(min(t + step, tfinal), dt)
+        slice_wall_time = time.perf_counter() - slice_start
+        if slice_ms is None and t_reached > t and slice_wall_time > 0:
+            step = max(dt, (t_reached - t) / slice_wall_time * slice_wall)
+        # guard against a simulation that doesn't advance
+        t = t_reached if t_reached > t else min(t + step, tfinal)
+        elapsed = time.perf_counter() - wall_start
+        _report(t, tfinal, t / elapsed if elapsed > 0 else 0.0)
+        if on_slice is not None:
+            on_slice(t)
+        sys.stdout.flush()
+        await asyncio.sleep(0)
+        _check_abort()
+    return t
+
+
+def _report(t, tfinal, rate):
+    # rate in simulated ms per wall-clock second, eta in seconds
+    eta = (tfinal - t) / rate if rate > 0 else None
+    arbor_playground_js.progress(t, tfinal, rate, eta)
+
+
+def _check_abort():
+    if arbor_playground_js.abort_requested():
+        raise KeyboardInterrupt("simulation aborted")
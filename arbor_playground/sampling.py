@@ -0,0 +1,92 @@
+"""Shape-preserving downsampling of traces before plotting.
+
+A browser chart gets slow long before a simulation runs out of samples.
+Both methods here pick a subset of the original points, so values are
+never interpolated and spike peaks survive:
+
+- ``"minmax"`` keeps the minimum and maximum of every bucket, fully
+  vectorized. Use it for dense voltage traces.
+- ``"lttb"`` is Largest-Triangle-Three-Buckets, which keeps the point per
+  bucket that spans the largest triangle with its neighbours. It gives
+  the visually closest line for a given point count, at the cost of a
+  Python loop over the buckets.
+"""
+
+import numpy as np
+
+__all__ = ["downsample", "minmax_indices", "lttb_indices"]
+
+
+def downsample(x, y, n=2000, method="minmax"):
+    """Return ``(x, y)`` reduced to about ``n`` points.
+
+    ``x`` must be sorted. ``y`` can be 1D, or 2D with one trace per column,
+    in which case the points are chosen on the first column.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    idx = indices(x, y if y.ndim == 1 else y[:, 0], n, method)
+    return x[idx], y[idx]
+
+
+def indices(x, y, n=2000, method="minmax"):
+    """Sorted indices of the points :func:`downsample` keeps."""
+    if method == "minmax":
+        return minmax_indices(y, n)
+    if method == "lttb":
+        return lttb_indices(x, y, n)
+    raise ValueError(f"Unknown downsampling method {method!r}, use 'minmax' or 'lttb'")
+
+
+def minmax_indices(y, n=2000):
+    """Indices of the minimum and maximum of ``n // 2`` equal buckets.
+
+    The first and last point are always included, so is the remainder that
+    doesn't fill a whole bucket.
+    """
+    y = np.asarray(y)
+    size = len(y)
+    if size <= n:
+        return np.arange(size)
+    nbuckets = max(1, n // 2)
+    width = size // nbuckets
+    body = y[: nbuckets * width].reshape(nbuckets, width)
+    offsets = np.arange(nbuckets) * width
+    idx = np.concatenate([
+        [0, size - 1],
+        offsets + body.argmin(axis=1),
+        offsets + body.argmax(axis=1),
+        np.arange(nbuckets * width, size),
+    ])
+    return np.unique(idx)
+
+
+def lttb_indices(x, y, n=2000):
+    """Indices chosen by Largest-Triangle-Three-Buckets."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    if size <= n or n < 3:
+        return np.arange(size)
+    # the first and last point are kept, the rest is split in n - 2 buckets
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    # the average of each bucket, used as third point of the triangle
+    sums_x = np.add.reduceat(x[1 : size - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1 : size - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+    idx = np.empty(n, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # twice the triangle area, the constant factor doesn't matter
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a])
+        )
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
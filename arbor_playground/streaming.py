@@ -0,0 +1,142 @@
+"""Plots that fill in while a simulation runs.
+
+A :class:`StreamingRecorder` owns the samplers and spike recording of a
+simulation. After every slice of :func:`arbor_playground.run` it drains
+what was recorded since the previous slice and sends only that to the
+page, which appends it to the charts with ``Plotly.extendTraces``::
+
+    recorder = arbor_playground.StreamingRecorder(sim)
+    for gid in range(ncells):
+        recorder.sample((gid, 0), arbor.regular_schedule(0.1), name=f"cell {gid}")
+    recorder.spikes()
+    await recorder.run(tfinal=1000, dt=0.025)
+
+Updates are sent at most ``fps`` times per second. Every trace keeps its
+last ``window`` points, on the page as well as in :meth:`samples` and
+:meth:`spike_data`, so memory doesn't grow with the length of the run.
+Draining clears the simulation's samplers (``sim.clear_samplers()``), so
+read recorded data from the recorder, not from ``sim.samples``.
+"""
+
+import time
+
+import arbor
+import numpy as np
+from pyodide.ffi import to_js
+
+import arbor_playground_js
+
+from .plotting import plot
+from .runner import run
+
+__all__ = ["StreamingRecorder"]
+
+
+def _tail(array, n):
+    return array[-n:] if len(array) > n else array
+
+
+class StreamingRecorder:
+    """Samples and spikes of ``sim``, streamed to charts ``id`` and ``id + "-spikes"``."""
+
+    def __init__(self, sim, id="stream", window=5000, fps=20, title=None):
+        self.sim = sim
+        self.id = str(id)
+        self.window = window
+        self.interval = 1 / fps
+        self.title = title
+        self.names = []
+        self.handles = []
+        self.record_spikes = False
+        self._data = []
+        self._pending = []
+        self._spikes = np.empty((0, 2))
+        self._pending_spikes = []
+        self._last_push = None
+
+    def sample(self, probe_id, schedule, name=None):
+        """Stream probe ``probe_id`` (``(gid, index)``) as a trace called ``name``."""
+        self.handles.append(self.sim.sample(probe_id, schedule))
+        self.names.append(str(probe_id) if name is None else name)
+        self._data.append(np.empty((0, 2)))
+        self._pending.append([])
+
+    def spikes(self):
+        """Stream all spikes as a raster."""
+        self.sim.record(arbor.spike_recording.all)
+        self.record_spikes = True
+
+    def start(self):
+        """Show empty charts, :meth:`run` does this."""
+        layout = {"xaxis": {"title": "t/ms"}, "uirevision": self.id}
+        if self.title is not None:
+            layout["title"] = self.title
+        if self.handles:
+            traces = [{"type": "scattergl", "mode": "lines", "name": name, "x": [], "y": []}
+                      for name in self.names]
+            plot({"data": traces, "layout": {**layout, "yaxis": {"title": "U/mV"}}}, id=self.id)
+        if self.record_spikes:
+            trace = {"type": "scattergl", "mode": "markers", "name": "spikes", "x": [], "y": [],
+                     "marker": {"size": 3}}
+            plot({"data": [trace], "layout": {**layout, "yaxis": {"title": "gid"}}},
+                 id=self.id + "-spikes")
+        self._last_push = None
+
+    def update(self, t=None):
+        """Drain the simulation, and send what is new if a frame is due."""
+        for i, handle in enumerate(self.handles):
+            recorded = self.sim.samples(handle)
+            if recorded and len(recorded[0][0]):
+                data = recorded[0][0]
+                self._pending[i].append(data)
+                self._data[i] = _tail(np.concatenate([self._data[i], data]), self.window)
+        if self.record_spikes:
+            spikes = self.sim.spikes()
+            if len(spikes):
+                new = np.column_stack([spikes["time"], spikes["source"]["gid"]])
+                self._pending_spikes.append(new)
+                self._spikes = _tail(np.concatenate([self._spikes, new]), self.window)
+        self.sim.clear_samplers()
+        now = time.perf_counter()
+        if self._last_push is None or now - self._last_push >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Send everything not yet sent."""
+        self._last_push = time.perf_counter()
+        indices, xs, ys = [], [], []
+        for i, chunks in enumerate(self._pending):
+            if chunks:
+                data = _tail(np.concatenate(chunks), self.window)
+                indices.append(i)
+                xs.append(np.ascontiguousarray(data[:, 0]))
+                ys.append(np.ascontiguousarray(data[:, 1]))
+                self._pending[i] = []
+        if indices:
+            self._extend(self.id, xs, ys, indices)
+        if self._pending_spikes:
+            spikes = _tail(np.concatenate(self._pending_spikes), self.window)
+            self._pending_spikes = []
+            self._extend(self.id + "-spikes", [np.ascontiguousarray(spikes[:, 0])],
+                         [np.ascontiguousarray(spikes[:, 1])], [0])
+
+    def _extend(self, id, xs, ys, indices):
+        arbor_playground_js.extend(id, to_js(xs), to_js(ys), to_js(indices), self.window)
+
+    async def run(self, tfinal, dt=0.025, **kwargs):
+        """:func:`arbor_playground.run` the simulation, streaming after every slice."""
+        self.start()
+        t = await run(self.sim, tfinal, dt, on_slice=self.update, **kwargs)
+        self.update(t)
+        self.flush()
+        return t
+
+    def samples(self, i=0):
+        """The last ``window`` samples of trace ``i`` (an index or name) as ``(t, value)`` rows."""
+        if not isinstance(i, int):
+            i = self.names.index(i)
+        return self._data[i]
+
+    def spike_data(self):
+        """The last ``window`` spikes as ``(time, gid)`` rows."""
+        return self._spikes
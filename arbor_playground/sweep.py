@@ -0,0 +1,72 @@
+"""Parameter sweeps spread over a pool of interpreters.
+
+The WebAssembly build of arbor runs on one thread, so a sweep inside a
+single script uses one core. :func:`sweep` hands every parameter set to
+a pool of workers instead, each with its own Pyodide and arbor, sized
+from ``navigator.hardwareConcurrency`` by default. Tasks go to whichever
+worker is free, results come back in the order of ``params``. The pool
+is started on first use and kept for later runs.
+
+Workers load the script itself with ``__name__`` set to ``"__sweep__"``
+and call ``fn`` by name, much like ``multiprocessing`` does. So ``fn``
+has to be defined at the top level of the script, and the part of the
+script that starts the sweep has to be guarded::
+
+    def firing_rate(current):
+        ...
+
+    if __name__ == "__main__":
+        rates = await arbor_playground.sweep(firing_rate, np.linspace(0, 1, 40))
+
+Parameters and results are pickled. A dict of parameters is passed as
+keyword arguments, anything else as the only argument. ``fn`` can also
+be a coroutine function.
+"""
+
+import inspect
+import pickle
+import traceback
+
+import arbor_playground_js
+from pyodide.ffi import to_js
+
+from .runner import _check_abort
+
+__all__ = ["sweep", "SweepError"]
+
+
+class SweepError(Exception):
+    """A sweep task raised, the message holds its traceback."""
+
+
+async def sweep(fn, params, workers=None):
+    """Call ``fn`` for every entry of ``params`` on the worker pool, returns the results."""
+    name = fn.__name__
+    if fn.__globals__.get(name) is not fn:
+        raise ValueError(f"{name} has to be a function defined at the top level of the script")
+    params = list(params)
+    payloads = to_js([pickle.dumps(p) for p in params])
+    try:
+        replies = await arbor_playground_js.sweep(name, payloads, workers)
+    finally:
+        _check_abort()
+    results = []
+    for p, reply in zip(params, replies):
+        ok, value = pickle.loads(reply.to_bytes())
+        if not ok:
+            raise SweepError(f"{name}({p!r}) failed:\n{value}")
+        results.append(value)
+    return results
+
+
+async def _call(namespace, name, payload):
+    # runs in a pool worker, returns the pickled (ok, result or traceback)
+    try:
+        p = pickle.loads(payload.to_bytes())
+        fn = namespace[name]
+        value = fn(**p) if isinstance(p, dict) else fn(p)
+        if inspect.isawaitable(value):
+            value = await value
+        return pickle.dumps((True, value))
+    except Exception:
+        return pickle.dumps((False, traceback.format_exc()))
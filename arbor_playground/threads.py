@@ -0,0 +1,36 @@
+"""Execution contexts sized from the browser.
+
+``arbor.context("avail_threads")`` asks the C++ runtime how many threads
+it may use, which in the browser isn't the number of cores. Only a
+Pyodide and arbor built with Emscripten pthreads (see the README) can run
+more than one thread at all, and asking a single-threaded build for more
+crashes the interpreter. :func:`context` makes a context with as many
+threads as the build and ``navigator.hardwareConcurrency`` allow::
+
+    context = arbor_playground.context()
+    decomp = arbor.partition_load_balance(recipe, context)
+    sim = arbor.simulation(recipe, context, decomp)
+"""
+
+import warnings
+
+import arbor
+import arbor_playground_js
+
+__all__ = ["num_threads", "context"]
+
+
+def num_threads():
+    """Threads arbor can use here, 1 unless this is a pthreads build."""
+    return int(arbor_playground_js.thread_count())
+
+
+def context(threads=None):
+    """An ``arbor.context`` with ``threads`` threads, by default all of :func:`num_threads`."""
+    available = num_threads()
+    if threads is None:
+        threads = available
+    elif threads > available:
+        warnings.warn(f"only {available} threads available, not {threads}")
+        threads = available
+    return arbor.context(threads=threads)
@@ -0,0 +1,28 @@
+"""Named phases on the page's timeline.
+
+The page records how long booting and every run take, phase by phase, in
+its Timeline dialog. :func:`phase` adds the phases of a script, timed on
+the same clock as the rest::
+
+    with arbor_playground.phase("recipe construction"):
+        recipe = brunel_recipe(...)
+
+They also show up as ``performance.measure`` entries in the browser's
+devtools.
+"""
+
+import contextlib
+
+import arbor_playground_js
+
+__all__ = ["phase"]
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Time the ``with`` block as phase ``name`` of the current run."""
+    start = arbor_playground_js.now()
+    try:
+        yield
+    finally:
+        arbor_playground_js.phase(str(name), start, arbor_playground_js.now())
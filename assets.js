@@ -0,0 +1,177 @@
+/*
+ * Asset store for the files a model lists in its `filesystem`.
+ *
+ * Downloads are kept in /assets, a directory backed by IndexedDB (IDBFS)
+ * that survives reloads, one file per sha256 of the content. index.json
+ * in there maps urls to hashes. The files of a model are symlinks into
+ * it, so:
+ *
+ *  - a url that has been downloaded before is linked right away, and
+ *    downloaded again in the background once it is REVALIDATE_AFTER old
+ *  - requests for a url that is already downloading share the download,
+ *    and urls with the same content share one stored file
+ *  - lazy files that aren't stored yet become FS.createLazyFile files,
+ *    only downloaded when the script reads them. Once all of a lazy file
+ *    has been fetched it is stored too, so later sessions link it right
+ *    away
+ */
+
+const ASSET_DIR = '/assets'
+const ASSET_INDEX = ASSET_DIR + '/index.json'
+const REVALIDATE_AFTER = 24 * 60 * 60 * 1000 // ms
+
+async function sha256_hex(bytes) {
+    const digest = await crypto.subtle.digest('SHA-256', bytes)
+    return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('')
+}
+
+class AssetStore {
+    constructor(FS, { persist = true } = {}) {
+        this.FS = FS
+        // pool workers only read, syncing would drop files only the page's worker has
+        this.persist = persist
+        this.index = {} // url -> { hash, checked }
+        this.downloads = new Map()
+        this.sync_timer = null
+        this.ready = Promise.resolve()
+    }
+
+    mount() {
+        this.FS.mkdirTree(ASSET_DIR)
+        this.FS.mount(this.FS.filesystems.IDBFS, {}, ASSET_DIR)
+        this.ready = this.syncfs(true).then(() => {
+            if (this.exists(ASSET_INDEX)) {
+                this.index = JSON.parse(this.FS.readFile(ASSET_INDEX, { encoding: 'utf8' }))
+            }
+        }).catch(error => console.warn('Asset store not restored', error))
+        return this.ready
+    }
+
+    syncfs(populate) {
+        return new Promise((resolve, reject) => {
+            this.FS.syncfs(populate, error => error ? reject(error) : resolve())
+        })
+    }
+
+    exists(path) {
+        return this.FS.analyzePath(path).exists
+    }
+
+    path(hash) {
+        return ASSET_DIR + '/' + hash
+    }
+
+    stored(url) {
+        const entry = this.index[url]
+        return entry !== undefined && this.exists(this.path(entry.hash))
+    }
+
+    /* { hash, path } of url, downloading it if it isn't stored. With
+     * compile, a fresh download is also compiled as a WebAssembly module
+     * while it streams, the promise of which is the compiling field. */
+    async get(url, { compile = false } = {}) {
+        await this.ready
+        if (this.stored(url)) {
+            const { hash, checked } = this.index[url]
+            if (Date.now() - checked > REVALIDATE_AFTER) {
+                this.download(url).catch(error => console.warn('Revalidating', url, error))
+            }
+            return { hash, path: this.path(hash) }
+        }
+        return this.download(url, compile)
+    }
+
+    download(url, compile=false) {
+        let pending = this.downloads.get(url)
+        if (pending === undefined) {
+            pending = this.fetch(url, compile).finally(() => this.downloads.delete(url))
+            this.downloads.set(url, pending)
+        }
+        return pending
+    }
+
+    async fetch(url, compile) {
+        const r = await fetch(url)
+        if (!r.ok) {
+            throw new Error(`${url}: ${r.status} ${r.statusText}`)
+        }
+        const compiling = compile ? WebAssembly.compileStreaming(r.clone()).catch(error => {
+            console.warn('Streaming compilation failed', error)
+            return null
+        }) : null
+        const stored = await this.store(url, new Uint8Array(await r.arrayBuffer()))
+        return { ...stored, compiling }
+    }
+
+    /* Store bytes as the content of url */
+    async store(url, bytes) {
+        const hash = await sha256_hex(bytes)
+        if (!this.exists(this.path(hash))) {
+            this.FS.writeFile(this.path(hash), bytes)
+        }
+        this.index[url] = { hash, checked: Date.now() }
+        this.save()
+        return { hash, path: this.path(hash) }
+    }
+
+    save() {
+        this.FS.writeFile(ASSET_INDEX, JSON.stringify(this.index))
+        if (!this.persist || this.sync_timer !== null) return
+        // one IndexedDB sync for a burst of downloads
+        this.sync_timer = setTimeout(() => {
+            this.sync_timer = null
+            this.syncfs(false).catch(error => console.warn('Asset store not saved', error))
+        }, 500)
+    }
+
+    unlink(path) {
+        if (this.FS.analyzePath(path).exists || this.FS.analyzePath(path, true).exists) {
+            this.FS.unlink(path)
+        }
+    }
+
+    /* Make path a link to the stored asset with this hash */
+    link(hash, path) {
+        this.unlink(path)
+        this.FS.symlink(this.path(hash), path)
+    }
+
+    /* Make path a file that downloads url on first read. Once reads
+     * fetched all of it, the fetched bytes are stored, after which path
+     * becomes a link to the stored copy. */
+    lazy(url, path) {
+        this.unlink(path)
+        const slash = path.lastIndexOf('/')
+        const dir = slash === -1 ? this.FS.cwd() : path.slice(0, slash) || '/'
+        const node = this.FS.createLazyFile(dir, path.slice(slash + 1), url, true, false)
+        // streams copy the node's stream_ops when opened, wrap them before
+        const read = node.stream_ops.read
+        let storing = false
+        node.stream_ops = { ...node.stream_ops, read: (...args) => {
+            const n = read(...args)
+            const bytes = storing ? null : fetched_bytes(node.contents)
+            if (bytes !== null) {
+                storing = true
+                this.store(url, bytes)
+                    .then(({ hash }) => this.link(hash, path))
+                    .catch(error => console.warn('Lazy file not stored', url, error))
+            }
+            return n
+        } }
+    }
+}
+
+/* All bytes of an emscripten LazyUint8Array, null while some of its
+ * chunks haven't been fetched */
+function fetched_bytes(contents) {
+    if (contents === undefined || contents.chunks === undefined) return null
+    const length = contents.length
+    const size = contents.chunkSize
+    const bytes = new Uint8Array(length)
+    for (let i = 0; i * size < length; i++) {
+        const chunk = contents.chunks[i]
+        if (chunk === undefined) return null
+        bytes.set(chunk.subarray(0, Math.min(size, length - i * size)), i * size)
+    }
+    return bytes
+}
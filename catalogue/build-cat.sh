@@ -11,6 +11,14 @@ ARB_INCLUDE=/home/llandsmeer/repos/llandsmeer/arbor/build-emscripten/prefix/incl
 
 CATS=io
 
+# Every catalogue is built twice: scalar, and with WebAssembly SIMD for
+# browsers that support it (the worker picks one, see write_files in
+# worker.js). modcc's explicit SIMD backend has no wasm target, so the
+# simd128 build relies on clang auto-vectorizing the generated kernels,
+# which it does at -O2. Both use the same flags otherwise, so benchmarks
+# compare SIMD only.
+VARIANTS="scalar simd128"
+
 for CATNAME in ${CATS}
 do
 
@@ -27,10 +35,22 @@ do
     echo "${CATNAME}"/*.mod
     ${MODCC} -N arb -c "${CATNAME}" -o "${GEN}" -t cpu "${CATNAME}"/*.mod
 
+    for VARIANT in ${VARIANTS}
+    do
+
+    if [ "${VARIANT}" = simd128 ]
+    then
+        SUFFIX=.simd128
+        VARIANT_FLAGS=-msimd128
+    else
+        SUFFIX=
+        VARIANT_FLAGS=
+    fi
+
     em++ "${GEN}"/*.cpp \
         -I "${ARB_INCLUDE}" \
         -std=c++20 \
-        -o "${CATNAME}-catalogue.so" \
+        -o "${CATNAME}-catalogue${SUFFIX}.so" \
         -shared -fPIC \
         -s ALLOW_MEMORY_GROWTH=1 \
         -s LINKABLE=1 \
@@ -40,7 +60,10 @@ do
         -s WASM_BIGINT=1 \
         -DSTANDALONE=1 \
         -g0 \
-        -O2
+        -O2 \
+        ${VARIANT_FLAGS}
+
+    done
 
     rm -fr "$TMP"
 done
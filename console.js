@@ -0,0 +1,139 @@
+/*
+ * Console pane backed by a ring buffer of lines.
+ *
+ * Writes only append to the buffer, the DOM is updated at most once per
+ * animation frame and only the rows inside the visible part of the scroll
+ * container are materialized. Old lines are dropped once max_lines is
+ * reached, so a script printing in a loop can't grow the page unbounded.
+ * Rows need a fixed height for that, so long lines don't wrap, the pane
+ * scrolls horizontally instead.
+ */
+
+const CONSOLE_MAX_LINES = 10000
+
+class OutputConsole {
+    constructor(scroll_el, output_el, { max_lines = CONSOLE_MAX_LINES } = {}) {
+        this.scroll_el = scroll_el
+        this.output_el = output_el
+        this.max_lines = max_lines
+        this.lines = new Array(max_lines)
+        this.classes = new Array(max_lines)
+        this.start = 0
+        this.length = 0
+        this.dropped = 0
+        this.tail = ''
+        this.tail_class = null
+        this.row_height = 0
+        this.stick_to_bottom = true
+        this.frame_requested = false
+        this.rows_el = document.createElement('div')
+        this.rows_el.className = 'console-rows'
+        this.output_el.replaceChildren(this.rows_el)
+        this.scroll_el.addEventListener('scroll', () => {
+            const el = this.scroll_el
+            this.stick_to_bottom = el.scrollTop + el.clientHeight >= el.scrollHeight - this.row_height
+            this.schedule()
+        })
+        new ResizeObserver(() => {
+            this.row_height = 0
+            this.schedule()
+        }).observe(this.scroll_el)
+    }
+
+    write(text, cls=null) {
+        const parts = (this.tail + text).split('\n')
+        if (this.tail !== '' && this.tail_class !== cls) {
+            // don't merge a partial line into a line of another stream
+            parts[0] = parts[0].slice(this.tail.length)
+            this.push(this.tail, this.tail_class)
+        }
+        this.tail = parts.pop()
+        this.tail_class = cls
+        for (const line of parts) {
+            this.push(line, cls)
+        }
+        this.schedule()
+    }
+
+    push(line, cls) {
+        let idx
+        if (this.length < this.max_lines) {
+            idx = (this.start + this.length) % this.max_lines
+            this.length += 1
+        } else {
+            idx = this.start
+            this.start = (this.start + 1) % this.max_lines
+            this.dropped += 1
+        }
+        this.lines[idx] = line
+        this.classes[idx] = cls
+    }
+
+    clear() {
+        this.start = 0
+        this.length = 0
+        this.dropped = 0
+        this.tail = ''
+        this.tail_class = null
+        this.stick_to_bottom = true
+        this.schedule()
+    }
+
+    schedule() {
+        if (this.frame_requested) return
+        this.frame_requested = true
+        requestAnimationFrame(() => {
+            this.frame_requested = false
+            this.render()
+        })
+    }
+
+    row_count() {
+        return (this.dropped > 0 ? 1 : 0) + this.length + (this.tail !== '' ? 1 : 0)
+    }
+
+    row(i) {
+        // virtual row i, including the 'dropped' notice and the partial tail
+        if (this.dropped > 0) {
+            if (i === 0) return [`[${this.dropped} earlier lines dropped]`, 'dropped']
+            i -= 1
+        }
+        if (i < this.length) {
+            const idx = (this.start + i) % this.max_lines
+            return [this.lines[idx], this.classes[idx]]
+        }
+        return [this.tail, this.tail_class]
+    }
+
+    measure_row_height() {
+        const probe = document.createElement('div')
+        probe.textContent = 'X'
+        this.rows_el.replaceChildren(probe)
+        this.row_height = probe.getBoundingClientRect().height || 16
+    }
+
+    render() {
+        if (this.row_height === 0) {
+            this.measure_row_height()
+        }
+        const total = this.row_count()
+        const h = this.row_height
+        this.output_el.style.height = (total * h) + 'px'
+        if (this.stick_to_bottom) {
+            this.scroll_el.scrollTop = this.scroll_el.scrollHeight
+        }
+        const top = this.scroll_el.scrollTop - this.output_el.offsetTop
+        const first = Math.max(0, Math.floor(top / h) - 5)
+        const last = Math.min(total, Math.ceil((top + this.scroll_el.clientHeight) / h) + 5)
+        const fragment = document.createDocumentFragment()
+        for (let i = first; i < last; i++) {
+            const [line, cls] = this.row(i)
+            const el = document.createElement('div')
+            el.textContent = line === '' ? ' ' : line
+            if (cls) el.className = cls
+            fragment.appendChild(el)
+        }
+        this.rows_el.style.top = (first * h) + 'px'
+        this.rows_el.replaceChildren(fragment)
+    }
+}
@@ -1,95 +1,3 @@
-const MODELS = [
-{ title: 'Example models:', is_header: true, },
-    {
-        title: 'Brunel network',
-        url: 'models/brunel.py',
-        description: 'Advanced network example. Sparsely connected excitatory and inhibitory LIF cells exhibit different synchronization states. Brunel, N. (2000). Dynamics of sparsely connected networks of excitatory and inhibitory spiking neurons. Journal of computational neuroscience, 8(3), 183-208.',
-        enabled: true
-    },
-    {
-        title: 'Cluster synchronization in the Inferior Olive',
-        url: 'models/io_network.py',
-        description: 'Inferior Olive neuron model due to Smol et al. Uses a custom catalogue generated from NeuroML source using NMLCC. Network version.',
-        enabled: true,
-        filesystem: [
-            { path: 'io-catalogue.so', url: 'catalogue/io-catalogue.so' }
-        ],
-    },
-{ title: 'Arbor usage examples:', is_header: true, },
-    {
-        load_first: true,
-        title: 'Single Hodgkin-Huxley cell (single_cell_model)',
-        url: 'models/single_cell_model.py',
-        description: 'The smallest possible useful Arbor example. A single Hodgkin-Huxley cell constructed via the simple arbor.single_cell_model API. The single_cell_model is not as powerful a full recipe construction, but is very convenient for if you\'re only simulating a single cell and only interested in recording voltages.',
-        enabled: true
-    },
-    {
-        title: 'Single Hodgkin-Huxley cell (recipe)',
-        url: 'models/single_cell_recipe.py',
-        description: 'Single Hodgkin-Huxley cell via the recipe API, which allows for more complicated network construction.',
-        enabled: true
-    },
-    {
-        title: 'Single cell Allen',
-        url: 'models/single_cell_allen.py',
-        description: 'Multicompartmental cell comparison between NEURON and Arbor. Quite slow to run.',
-        filesystem: [
-            { path: 'single_cell_allen_fit.json', url: 'models/single_cell_allen_fit.json' },
-            { path: 'single_cell_allen.swc', url: 'models/single_cell_allen.swc' },
-            { path: 'single_cell_allen_neuron_ref.csv', url: 'https://raw.githubusercontent.com/arbor-sim/arbor/master/python/example/single_cell_allen_neuron_ref.csv' }
-        ],
-        enabled: false
-    },
-    {
-        title: 'Single cell detailed recipe (SWC morphology)',
-        url: 'models/single_cell_detailed_recipe.py',
-        description: 'Advanced single cell example that loads the cell morphology from an external SWC file. Sodium concentration reversal potential is calculated using the Nernst equations. This example is known to break on firefox.',
-        filesystem: [
-            { path: 'single_cell_detailed.swc', url: 'models/single_cell_detailed.swc' }
-        ],
-        enabled: true
-    },
-    {
-        title: 'Single Inferior Olive Neuron (custom mechanisms)',
-        url: 'models/io_single_cell.py',
-        description: 'Inferior Olive neuron model due to Smol et al. Uses a custom catalogue generated from NeuroML source using NMLCC.',
-        enabled: true,
-        filesystem: [
-            { path: 'io-catalogue.so', url: 'catalogue/io-catalogue.so' }
-        ],
-    },
-    {
-        title: 'Ring network',
-        url: 'models/network_ring.py',
-        description: 'Minimal example of a network in Arbor. Four cells connected with delayed synapses leads to a persistent traveling wave in the network.',
-        enabled: true
-    },
-    {
-        title: 'Spike-timing-dependent plasticity',
-        url: 'models/single_cell_stdp.py',
-        description: 'STDP example using a single cell and explicit spike generators. Plots out weight change as a function of simulus distance over multiple simulations.',
-        enabled: true
-    },
-    {
-        title: 'Gap junction network',
-        url: 'models/gap_junctions.py',
-        description: 'Minimal example of multicompartmental cells connected via electrically conducting gap junctions and time delay synapses.',
-        enabled: true
-    },
-    {
-        title: 'Ion diffusion',
-        url: 'models/diffusion.py',
-        description: 'Minimal example showcasing sodium diffusion through cell compartments.',
-        enabled: true
-    },
-    {
-        title: 'Modifying network topology',
-        url: 'models/plasticity.py',
-        description: 'Example of modifying synaptic connections in a running simulation. This is done via the simulation.update_connections(recipe) function, which re-reads the recipe\'s connections_on().',
-        enabled: true
-    },
-]
-
 function quote(text) {
     return (''+text).replaceAll('&', '&amp;')
         .replaceAll('<', '&lt;')
@@ -155,20 +63,228 @@ function add_resize_handler() {
     document.addEventListener('touchend', on_end, { passive: false })
 }
 
+async function register_service_worker() {
+    /* Returns true if the page is about to reload to become cross-origin isolated */
+    if (!('serviceWorker' in navigator)) return false
+    await navigator.serviceWorker.register('./sw.js')
+    if (window.crossOriginIsolated) {
+        sessionStorage.removeItem('isolation-reload')
+        return false
+    }
+    await navigator.serviceWorker.ready
+    // the isolation headers only apply to new navigations, reload once
+    if (sessionStorage.getItem('isolation-reload') === null) {
+        sessionStorage.setItem('isolation-reload', '1')
+        location.reload()
+        return true
+    }
+    return false
+}
+
 async function main() {
+    if (await register_service_worker()) return
     add_resize_handler();
     let editor = null
+    let ready = false
     let loader_icon = document.getElementById('loader-icon')
-    let console_output = document.getElementById('console')
+    let term = new OutputConsole(
+        document.getElementById('console-scroll'),
+        document.getElementById('console'))
     let run_btn = document.getElementById('run-btn')
+    let profile_btn = document.getElementById('profile-btn')
+    let meters_checkbox = document.getElementById('meters-checkbox')
+    let meter_report_el = document.getElementById('meter-report')
+    meters_checkbox.checked = localStorage.getItem('meters') === '1'
+    meters_checkbox.onchange = () => localStorage.setItem('meters', meters_checkbox.checked ? '1' : '0')
     let welcome_btn = document.getElementById('welcome-btn')
+    let timeline_btn = document.getElementById('timeline-btn')
+    let timeline = new TimelinePanel(document.getElementById('timeline'))
+    on_phase(phase => timeline.add(phase))
+    let run_progress = document.getElementById('run-progress')
+    let run_progress_bar = run_progress.querySelector('progress')
+    let run_progress_text = document.getElementById('run-progress-text')
+    let stop_btn = document.getElementById('stop-btn')
     let current_modal = null
     loader_icon.classList.add('loading')
     function message_ok(msg) {
-        console_output.innerHTML += quote(msg) + '\n'
+        term.write(msg + '\n')
     }
     function message_err(msg) {
-        console_output.innerHTML += '<span class="error">' + quote(msg) + '</span>\n'
+        term.write(msg + '\n', 'error')
+    }
+    let output_container = document.getElementById('render-html-output')
+    function render_html_output(html) {
+        var range = document.createRange();
+        let container = output_container
+        range.selectNode(container);
+        var documentFragment = range.createContextualFragment(html);
+        container.querySelectorAll(':scope > .plot').forEach(div => Plotly.purge(div))
+        while (container.hasChildNodes()) {  
+            container.removeChild(container.firstChild);
+        }
+        container.appendChild(documentFragment);
+        container.className = "plotly";
+    }
+    /* Charts from arbor_playground.plot are kept between runs and updated
+     * in place with Plotly.react, a chart that isn't plotted again during a
+     * run is removed when it ends */
+    let plots_seen = new Set()
+    function render_plot({id, data, layout}) {
+        let div = null
+        for (const child of output_container.children) {
+            if (child.dataset.plotId === id) div = child
+        }
+        if (div === null) {
+            div = document.createElement('div')
+            div.className = 'plot'
+            div.dataset.plotId = id
+            output_container.appendChild(div)
+        }
+        plots_seen.add(id)
+        timed_phase('render ' + id, () => Plotly.react(div, data, layout, { responsive: true }),
+            { source: 'page', run: run_id })
+    }
+    /* Points from arbor_playground.StreamingRecorder, appended at most
+     * once per frame per plot */
+    let pending_extends = new Map()
+    function concat_arrays(chunks) {
+        if (chunks.length === 1) return chunks[0]
+        const out = new Float64Array(chunks.reduce((n, c) => n + c.length, 0))
+        let offset = 0
+        for (const chunk of chunks) {
+            out.set(chunk, offset)
+            offset += chunk.length
+        }
+        return out
+    }
+    function apply_extends() {
+        for (const [id, {traces, max_points}] of pending_extends) {
+            const div = [...output_container.children].find(child => child.dataset.plotId === id)
+            if (div === undefined) continue
+            const indices = [...traces.keys()]
+            const x = indices.map(i => concat_arrays(traces.get(i).x))
+            const y = indices.map(i => concat_arrays(traces.get(i).y))
+            Plotly.extendTraces(div, { x, y }, indices, max_points)
+        }
+        pending_extends = new Map()
+    }
+    function extend_plot({id, x, y, indices, max_points}) {
+        if (pending_extends.size === 0) requestAnimationFrame(apply_extends)
+        if (!pending_extends.has(id)) pending_extends.set(id, { traces: new Map(), max_points })
+        const traces = pending_extends.get(id).traces
+        indices.forEach((trace, k) => {
+            if (!traces.has(trace)) traces.set(trace, { x: [], y: [] })
+            traces.get(trace).x.push(x[k])
+            traces.get(trace).y.push(y[k])
+        })
+    }
+    function begin_output() {
+        plots_seen = new Set()
+        for (const child of [...output_container.children]) {
+            if (child.dataset.plotId === undefined) child.remove()
+        }
+    }
+    /* cells is the { count, ran, skipped } of a run of # %% cells. Charts
+     * of cells that were skipped are kept. */
+    function plot_stale(id, cells) {
+        if (!cells || cells.skipped.length === 0) return true
+        const match = /^cell-(\d+)-/.exec(id)
+        if (match === null) return false
+        const cell = parseInt(match[1])
+        return cells.ran.includes(cell) || cell >= cells.count
+    }
+    function end_output(cells) {
+        for (const child of [...output_container.children]) {
+            const id = child.dataset.plotId
+            if (id !== undefined && !plots_seen.has(id) && plot_stale(id, cells)) {
+                Plotly.purge(child)
+                child.remove()
+            }
+        }
+    }
+    /* Report of arbor_playground.meters, shown next to the console */
+    function show_meter_report({report}) {
+        const mib = bytes => (bytes / (1 << 20)).toFixed(1)
+        const rows = report.phases.map(p => `
+            <tr>
+                <td>${quote(p.name)}</td>
+                <td>${p.calls}</td>
+                <td>${p.seconds.toFixed(3)}</td>
+                <td>${p.heap_after > p.heap_before ? '+' + mib(p.heap_after - p.heap_before) : ''}</td>
+            </tr>`).join('')
+        meter_report_el.innerHTML = `
+            <p>Meters: ${report.seconds.toFixed(3)} s, heap ${mib(report.heap_bytes)} MiB
+                <button type="button">Copy JSON</button></p>
+            <table>
+                <tr><th>phase</th><th>calls</th><th>s</th><th>MiB</th></tr>
+                ${rows}
+            </table>`
+        meter_report_el.querySelector('button').onclick = () =>
+            navigator.clipboard.writeText(JSON.stringify(report, null, 2))
+        meter_report_el.classList.add('visible')
+    }
+    function show_progress({t, tfinal, rate, eta}) {
+        run_progress.classList.add('running')
+        run_progress_bar.value = tfinal > 0 ? t / tfinal : 0
+        let text = `${t.toFixed(1)}/${tfinal} ms`
+        if (rate > 0) {
+            text += ` ${rate.toPrecision(3)} ms/s`
+        }
+        if (eta !== undefined && eta !== null) {
+            text += ` ETA ${Math.ceil(eta)}s`
+        }
+        run_progress_text.innerText = text
+    }
+    /* WebAssembly memory never shrinks. Once the interpreter's heap passes
+     * heap_limit (MiB, ?heap_limit=), or after a crash, the worker is
+     * replaced by a fresh one, see start_worker */
+    const heap_limit = (parseFloat(new URLSearchParams(location.search).get('heap_limit')) || 1024) * (1 << 20)
+    let heap_meter = document.getElementById('heap-meter')
+    let heap_text = document.getElementById('heap-text')
+    heap_meter.max = heap_limit
+    heap_meter.high = 0.8 * heap_limit
+    function show_heap(bytes) {
+        if (bytes === undefined || bytes === null) return
+        heap_meter.value = bytes
+        heap_text.innerText = `${Math.round(bytes / (1 << 20))} MiB`
+    }
+    const worker_handlers = {
+        output: ({stream, text}) => term.write(text, stream === 'stderr' ? 'error' : null),
+        render_html: ({html}) => render_html_output(html),
+        plot: render_plot,
+        extend: extend_plot,
+        progress: (progress) => {
+            show_progress(progress)
+            show_heap(progress.heap)
+        },
+        meter_report: show_meter_report,
+        phase: ({phase, time_origin}) => timeline.add(page_phase(phase, time_origin)),
+    }
+    let worker = null
+    // every file written so far by path, written again into a fresh worker
+    let worker_files = new Map()
+    // ?simd=0 forces the scalar builds, to compare against
+    const simd = new URLSearchParams(location.search).get('simd') !== '0'
+    /* Start an interpreter worker, replacing the current one. Requests are
+     * handled in order, so anything requested right away waits for init,
+     * the files and the warmup. Snapshot, service worker and compiled
+     * catalogues (see README) keep a restart much faster than the first. */
+    function start_worker() {
+        if (worker !== null) {
+            worker.terminate()
+        }
+        const w = new PyodideWorker(worker_handlers)
+        worker = w
+        const init = timed_phase('worker_init', () => w.request('init', { interrupt_buffer: w.interrupt_buffer, simd }),
+            { source: 'page' })
+        init.then(({heap_bytes}) => show_heap(heap_bytes), () => {})
+        if (worker_files.size > 0) {
+            w.request('write_files', { files: [...worker_files.values()] }).catch(() => {})
+        }
+        // rejected when the worker is replaced before they finish
+        w.request('warmup').catch(() => {})
+        init.then(() => w.request('prefetch', { modules: ['pandas', 'plotly'] })).catch(() => {})
+        return init
     }
     /* START MODAL CODE */
     document.querySelectorAll('.modal-close').forEach(e => {
@@ -192,6 +308,11 @@ async function main() {
     welcome_btn.onclick = () => {
         show_modal('welcome-modal')
     }
+    timeline_btn.onclick = () => {
+        show_modal('timeline-modal')
+        timeline.render()
+    }
+    document.getElementById('timeline-export').onclick = () => timeline.download()
     let container = document.getElementById('available-models')
     MODELS.forEach((model, i) => {
         // const is_localhost = location.hostname === 'localhost' || location.hostname === '127.0.0.1'
@@ -216,25 +337,19 @@ async function main() {
         }
     })
     async function load_model(model) {
-        if (editor == null) return
+        if (!ready) return
         loader_icon.classList.add('loading')
-        console_output.innerText = ''
+        term.clear()
         render_html_output('')
         let res = await fetch(model.url)
         editor.session.setValue(await res.text())
         if (model.filesystem) {
-            pyodide.FS.chdir('/home/pyodide')
-            for (const {path, url} of model.filesystem) {
-                let r = await fetch(url)
-                let data = await r.blob() // text() fails for .so files
-                console.log()
-                pyodide.FS.writeFile(path, new Uint8Array(await data.arrayBuffer()));
-                message_ok('Created file "' + path + '"')
-            }
+            model.filesystem.forEach(file => worker_files.set(file.path, file))
+            await worker.request('write_files', { files: model.filesystem })
         }
 
         if (model.enabled) {
-            await run_code()
+            await run_code(false, true)
         } else {
             message_ok('Note: script not automatically executed')
         }
@@ -242,121 +357,93 @@ async function main() {
     }
     document.querySelectorAll('.loadable-model').forEach(target => {
         target.onclick = async () => {
-            if (editor == null) return
+            if (!ready) return
             let idx = target.getAttribute('data-model-idx')
             let model = MODELS[idx]
-            await load_model(model)
             current_modal.style.display = 'none';
+            await load_model(model)
         }
     })
 
     /* END MODAL CODE */
-    message_ok('Loading...')
-    console.time('loadPyodide')
-    let pyodide = await loadPyodide({
-        stdout: (msg) => {
-            message_ok(msg)
-        },
-        stderr: (msg) => {
-            message_err(msg)
-        },
-    })
-    console.timeEnd('loadPyodide')
-    py = pyodide // global export for debugging
-    console.time('loadPackages')
-    await pyodide.loadPackage([
-        'micropip',
-        'numpy',
-        'pandas',
-        'arbor-0.7-py3-none-any.whl',
-        'tenacity-8.1.0-py3-none-any.whl',
-        'plotly-5.0.0-py2.py3-none-any.whl'])
-    console.timeEnd('loadPackages')
 
-    function render_html_output(html) {
-        var range = document.createRange();
-        let container = document.getElementById('render-html-output')
-        range.selectNode(container);
-        var documentFragment = range.createContextualFragment(html);
-        while (container.hasChildNodes()) {  
-            container.removeChild(container.firstChild);
-        }
-        container.appendChild(documentFragment);
-        container.className = "plotly";
-    }
-    let plot_module = {
-        render_html(html) {
-            render_html_output(html)
-        }
-    }
-    console.time('registerJsModule')
-    pyodide.registerJsModule('arbor_playground', plot_module)
-    message_ok('Registered html render module')
-    console.timeEnd('registerJsModule')
+    let end_phase = begin_phase('aceEditor', { source: 'page' })
+    editor = ace.edit('editor')
+    editor.setTheme('ace/theme/monokai')
+    editor.session.setMode('ace/mode/python')
+    end_phase()
 
-    async function run_code(code=null) {
-        if (code == null) {
-            console.time('run_code')
-            console_output.innerText = ''
-            render_html_output('')
-            run_btn.classList.remove("ready");
-            message_ok('Console output [' + (new Date()).toISOString() + ']')
+    let running = false
+    let run_id = null
+    let runs = 0
+    /* Scripts with # %% cells only run the cells that changed, or all of
+     * them with reset_cells */
+    async function run_code(profile=false, reset_cells=false) {
+        if (running) return
+        running = true
+        run_id = ++runs
+        const end_run = begin_phase('run_code', { source: 'page', run: run_id })
+        term.clear()
+        meter_report_el.classList.remove('visible')
+        begin_output()
+        run_btn.classList.remove("ready");
+        message_ok('Console output [' + (new Date()).toISOString() + ']')
+        // Stop is part of the progress bar, show it for the whole run, not
+        // only once arbor_playground.run reports progress
+        run_progress_bar.value = 0
+        run_progress_text.innerText = ''
+        run_progress.classList.add('running')
+        const request = {
+            code: editor.getValue(),
+            run_id,
+            profile,
+            meters: meters_checkbox.checked,
+            reset_cells,
         }
         try {
-            pyodide.globals.set('code_to_run',
-                code == null ? editor.getValue() : code);
-            await pyodide.runPython('exec(compile(code_to_run, "main.py", "exec"), {})')
-        } catch (error) {
-            let test = '' + error
-            console.log(test)
-            if (test.indexOf('PythonError') === -1) {
-                // probably internal pyodide error or CppError
-                // this means we can't use any of the pyodide functions anymore..
-                message_err(test)
-            } else {
-                const traceback = pyodide.pyimport('traceback')
-                const lines = traceback.format_exception(error)
-                let frames = []
-                for (let i = 0; i < lines.__len__(); i++) {
-                    frames.push(...(lines.get(i).split('\n')))
+            let result = await worker.request('run', request)
+            if (result.fatal) {
+                // the interpreter is unusable after e.g. a C++ exception or running out of memory
+                message_err('The interpreter crashed, running the script again in a fresh one')
+                start_worker()
+                result = await worker.request('run', request)
+                if (result.fatal) {
+                    message_err('The interpreter crashed again, starting a fresh one for the next run')
+                    start_worker()
                 }
-                let filtered_frames = ['PythonError: Traceback (most recent call last)']
-                let skip = true
-                for (let i = 1; i < frames.length; i++) {
-                    if (frames[i].indexOf("main.py") !== -1) {
-                        skip = false
-                    }
-                    if (!skip) {
-                        filtered_frames.push(frames[i])
-                    }
-                }
-                message_err(filtered_frames.join('\n'))
             }
-        }
-        console_output.scrollTop = console_output.scrollHeight;
-        if (code == null) {
+            end_output(result.cells)
+            show_heap(result.heap_bytes)
+            if (!result.fatal && result.heap_bytes > heap_limit) {
+                message_ok(`Interpreter heap at ${Math.round(result.heap_bytes / (1 << 20))} MiB, ` +
+                    'starting a fresh one for the next run')
+                start_worker()
+            }
+        } catch (error) {
+            // the worker failed the request, was terminated or never started
+            message_err('' + error)
+        } finally {
+            run_progress.classList.remove('running')
             run_btn.classList.add("ready");
-            console.timeEnd('run_code')
+            end_run()
+            running = false
         }
     }
 
-    console.time('cache_imports')
-    await run_code('import pandas, arbor, plotly, numpy')
-    console.timeEnd('cache_imports')
-
-    message_ok('Cached pandas, arbor, plotly')
+    await start_worker()
+    ready = true
 
-    console.time('aceEditor')
-    editor = ace.edit('editor')
-    editor.setTheme('ace/theme/monokai')
-    editor.session.setMode('ace/mode/python')
     message_ok('Set up editor')
-    console.timeEnd('aceEditor')
-
     message_ok('Ready!')
 
-    run_btn.onclick = async () => {
-        await run_code();
+    run_btn.onclick = async (event) => {
+        await run_code(false, event.shiftKey);
+    }
+    profile_btn.onclick = async () => {
+        if (ready) await run_code(true)
+    }
+    stop_btn.onclick = () => {
+        worker.abort()
     }
 
     await load_model(MODELS.find(m => m.load_first))
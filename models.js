@@ -0,0 +1,127 @@
+/*
+ * Models listed in the "Load model" dialog (index.js), also run by the
+ * headless benchmark (tools/benchmark.js).
+ *
+ * url is the script, filesystem the files written next to it before it
+ * runs (see write_files in worker.js). Only enabled models run
+ * automatically when loaded.
+ */
+
+const MODELS = [
+{ title: 'Example models:', is_header: true, },
+    {
+        title: 'Brunel network',
+        url: 'models/brunel.py',
+        description: 'Advanced network example. Sparsely connected excitatory and inhibitory LIF cells exhibit different synchronization states. Brunel, N. (2000). Dynamics of sparsely connected networks of excitatory and inhibitory spiking neurons. Journal of computational neuroscience, 8(3), 183-208.',
+        enabled: true
+    },
+    {
+        title: 'Cluster synchronization in the Inferior Olive',
+        url: 'models/io_network.py',
+        description: 'Inferior Olive neuron model due to Smol et al. Uses a custom catalogue generated from NeuroML source using NMLCC. Network version.',
+        enabled: true,
+        filesystem: [
+            { path: 'io-catalogue.so', url: 'catalogue/io-catalogue.so' }
+        ],
+    },
+{ title: 'Arbor usage examples:', is_header: true, },
+    {
+        load_first: true,
+        title: 'Single Hodgkin-Huxley cell (single_cell_model)',
+        url: 'models/single_cell_model.py',
+        description: 'The smallest possible useful Arbor example. A single Hodgkin-Huxley cell constructed via the simple arbor.single_cell_model API. The single_cell_model is not as powerful a full recipe construction, but is very convenient for if you\'re only simulating a single cell and only interested in recording voltages.',
+        enabled: true
+    },
+    {
+        title: 'Single Hodgkin-Huxley cell (recipe)',
+        url: 'models/single_cell_recipe.py',
+        description: 'Single Hodgkin-Huxley cell via the recipe API, which allows for more complicated network construction.',
+        enabled: true
+    },
+    {
+        title: 'Single cell Allen',
+        url: 'models/single_cell_allen.py',
+        description: 'Multicompartmental cell comparison between NEURON and Arbor. Quite slow to run.',
+        filesystem: [
+            { path: 'single_cell_allen_fit.json', url: 'models/single_cell_allen_fit.json' },
+            { path: 'single_cell_allen.swc', url: 'models/single_cell_allen.swc' },
+            { path: 'single_cell_allen_neuron_ref.csv', url: 'https://raw.githubusercontent.com/arbor-sim/arbor/master/python/example/single_cell_allen_neuron_ref.csv', lazy: true }
+        ],
+        enabled: false
+    },
+    {
+        title: 'Single cell detailed recipe (SWC morphology)',
+        url: 'models/single_cell_detailed_recipe.py',
+        description: 'Advanced single cell example that loads the cell morphology from an external SWC file. Sodium concentration reversal potential is calculated using the Nernst equations. This example is known to break on firefox.',
+        filesystem: [
+            { path: 'single_cell_detailed.swc', url: 'models/single_cell_detailed.swc' }
+        ],
+        enabled: true
+    },
+    {
+        title: 'Single Inferior Olive Neuron (custom mechanisms)',
+        url: 'models/io_single_cell.py',
+        description: 'Inferior Olive neuron model due to Smol et al. Uses a custom catalogue generated from NeuroML source using NMLCC.',
+        enabled: true,
+        filesystem: [
+            { path: 'io-catalogue.so', url: 'catalogue/io-catalogue.so' }
+        ],
+    },
+    {
+        title: 'Ring network',
+        url: 'models/network_ring.py',
+        description: 'Minimal example of a network in Arbor. Four cells connected with delayed synapses leads to a persistent traveling wave in the network.',
+        enabled: true
+    },
+    {
+        title: 'Spike-timing-dependent plasticity',
+        url: 'models/single_cell_stdp.py',
+        description: 'STDP example using a single cell and explicit spike generators. Plots out weight change as a function of simulus distance over multiple simulations.',
+        enabled: true
+    },
+    {
+        title: 'Parallel parameter sweep',
+        url: 'models/parallel_sweep.py',
+        description: 'Firing rate of a Hodgkin-Huxley cell as a function of input current. Every current is simulated separately, spread over a pool of workers with arbor_playground.sweep so the sweep uses all CPU cores.',
+        enabled: true
+    },
+    {
+        title: 'Thread scaling benchmark',
+        url: 'models/thread_benchmark.py',
+        description: 'Times a random network of 4000 LIF cells on 1, 2, 4 and 8 threads. Only a multithreaded build of arbor (see README) can use more than one thread, other thread counts are skipped.',
+        enabled: false
+    },
+    {
+        title: 'Mechanism SIMD benchmark',
+        url: 'models/simd_benchmark.py',
+        description: 'Times the Inferior Olive cell with the scalar build of its mechanism catalogue and, if the browser supports WebAssembly SIMD, with the simd128 build.',
+        filesystem: [
+            { path: 'io-catalogue.scalar.so', url: 'catalogue/io-catalogue.so' },
+            // add { path: 'io-catalogue.simd128.so', simd_url: 'catalogue/io-catalogue.simd128.so',
+            // optional: true } once the simd128 build is in the tree, see README
+        ],
+        enabled: false
+    },
+    {
+        title: 'Gap junction network',
+        url: 'models/gap_junctions.py',
+        description: 'Minimal example of multicompartmental cells connected via electrically conducting gap junctions and time delay synapses.',
+        enabled: true
+    },
+    {
+        title: 'Ion diffusion',
+        url: 'models/diffusion.py',
+        description: 'Minimal example showcasing sodium diffusion through cell compartments.',
+        enabled: true
+    },
+    {
+        title: 'Modifying network topology',
+        url: 'models/plasticity.py',
+        description: 'Example of modifying synaptic connections in a running simulation. This is done via the simulation.update_connections(recipe) function, which re-reads the recipe\'s connections_on().',
+        enabled: true
+    },
+]
+
+if (typeof module !== 'undefined') {
+    module.exports = { MODELS }
+}
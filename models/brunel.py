@@ -1,10 +1,5 @@
 import arbor
-import argparse
-import numpy as np
-from numpy.random import RandomState
 
-import pandas as pd
-import plotly.express as px
 import arbor_playground
 
 """
@@ -20,15 +15,6 @@ period, the activity is mostly driven by Poisson neurons and recurrent
 connections have a small effect.
 """
 
-# Samples m unique values in interval [start, end) - gid.
-# We exclude gid because we don't want self-loops.
-def sample_subset(gen, gid, start, end, m):
-    idx = np.arange(start, end)
-    if start <= gid < end:
-        idx = np.delete(idx, gid - start)
-    gen.shuffle(idx)
-    return idx[:m]
-    
 class brunel_recipe(arbor.recipe):
     def __init__(
         self,
@@ -67,6 +53,13 @@ class brunel_recipe(arbor.recipe):
         # to a single Poisson source with mean rate next*poiss_lambda
         self.lambda_ = next * poiss_lambda
 
+        # Draw all connections up front, connections_on only slices a row.
+        ncells = nexc + ninh
+        self.exc_ = arbor_playground.connectivity.fixed_indegree(
+            ncells, self.in_degree_exc_, sources=(0, nexc), seed=seed)
+        self.inh_ = arbor_playground.connectivity.fixed_indegree(
+            ncells, self.in_degree_inh_, sources=(nexc, ncells), seed=seed + 1)
+
     def num_cells(self):
         return self.ncells_exc_ + self.ncells_inh_
 
@@ -74,23 +67,15 @@ class brunel_recipe(arbor.recipe):
         return arbor.cell_kind.lif
 
     def connections_on(self, gid):
-        gen = RandomState(gid + self.seed_)
-        connections = []
         # Add incoming excitatory connections.
         connections = [
-            arbor.connection((i, "src"), "tgt", self.weight_exc_, self.delay_)
-            for i in sample_subset(gen, gid, 0, self.ncells_exc_, self.in_degree_exc_)
+            arbor.connection((int(i), "src"), "tgt", self.weight_exc_, self.delay_)
+            for i in self.exc_.row(gid)
         ]
         # Add incoming inhibitory connections.
         connections += [
-            arbor.connection((i, "src"), "tgt", self.weight_inh_, self.delay_)
-            for i in sample_subset(
-                gen,
-                gid,
-                self.ncells_exc_,
-                self.ncells_exc_ + self.ncells_inh_,
-                self.in_degree_inh_,
-            )
+            arbor.connection((int(i), "src"), "tgt", self.weight_inh_, self.delay_)
+            for i in self.inh_.row(gid)
         ]
 
         return connections
@@ -111,42 +96,48 @@ class brunel_recipe(arbor.recipe):
         sched = arbor.poisson_schedule(t0, self.lambda_, gid + self.seed_)
         return [arbor.event_generator("tgt", self.weight_ext_, sched)]
 
-context = arbor.context("avail_threads")
+# All threads the browser allows, see arbor_playground.num_threads
+context = arbor_playground.context()
 meters = arbor.meter_manager()
 meters.start(context)
 
-recipe = brunel_recipe(
-    # Number of cells in the excitatory population
-    nexc=400,
-    # Number of cells in the inhibitory population
-    ninh=100,
-    # Number of incoming Poisson (external) connections per cell
-    next=40,
-    # Proportion of the connections received per cell
-    in_degree_prop=0.05,
-    # Weight of excitatory connections
-    weight=1.2,
-    # Delay of all connections
-    delay=0.1,
-    # Relative strength of inhibitory synapses with respect to the excitatory ones
-    rel_inh_strength=1,
-    # Mean firing rate from a single poisson cell (kHz)
-    poiss_lambda=1,
-    # Seed for poisson spike generators
-    seed=42,
-)
+# Each phase shows up in the Timeline dialog
+with arbor_playground.phase("recipe construction"):
+    recipe = brunel_recipe(
+        # Number of cells in the excitatory population
+        nexc=400,
+        # Number of cells in the inhibitory population
+        ninh=100,
+        # Number of incoming Poisson (external) connections per cell
+        next=40,
+        # Proportion of the connections received per cell
+        in_degree_prop=0.05,
+        # Weight of excitatory connections
+        weight=1.2,
+        # Delay of all connections
+        delay=0.1,
+        # Relative strength of inhibitory synapses with respect to the excitatory ones
+        rel_inh_strength=1,
+        # Mean firing rate from a single poisson cell (kHz)
+        poiss_lambda=1,
+        # Seed for poisson spike generators
+        seed=42,
+    )
 meters.checkpoint("recipe-create", context)
 
-decomp = arbor.partition_load_balance(recipe, context)
+with arbor_playground.phase("partition_load_balance"):
+    decomp = arbor.partition_load_balance(recipe, context)
 
 meters.checkpoint("load-balance", context)
 
-sim = arbor.simulation(recipe, context, decomp)
-sim.record(arbor.spike_recording.all)
+with arbor_playground.phase("simulation init"):
+    sim = arbor.simulation(recipe, context, decomp)
+    sim.record(arbor.spike_recording.all)
 
 meters.checkpoint("simulation-init", context)
 
-sim.run(100, 1)
+with arbor_playground.phase("simulation run"):
+    sim.run(100, 1)
 
 meters.checkpoint("simulation-run", context)
 
@@ -156,11 +147,7 @@ print(f"{arbor.meter_report(meters, context)}")
 # Print spike times
 print(f"{len(sim.spikes())} spikes generated.")
 
-
-df = pd.DataFrame(
-    [(cell_id, t) for (cell_id, _), t in sim.spikes()],
-    columns=['Cell', 'Time (ms)'])
-
-fig = px.scatter(df, x='Time (ms)', y='Cell', title='Spikes')
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+arbor_playground.raster(sim, populations={
+    "excitatory": (0, recipe.ncells_exc_),
+    "inhibitory": (recipe.ncells_exc_, recipe.num_cells()),
+})
@@ -80,5 +80,4 @@ fig = go.Figure(
         legend_title="Time (ms)",
     )
 )
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+arbor_playground.plot(fig)
@@ -18,7 +18,9 @@ import arbor_playground
 # The individual cells consist of a soma and one dendrite
 
 
-def make_cable_cell(gid):
+# Every cell in the network is the same, so it is built once and shared.
+@arbor_playground.cell_templates.template
+def make_cable_cell():
 
     # Build a segment tree
     tree = arbor.segment_tree()
@@ -70,7 +72,7 @@ class chain_recipe(arbor.recipe):
         return self.ncells_per_chain * self.nchains
 
     def cell_description(self, gid):
-        return make_cable_cell(gid)
+        return make_cable_cell()
 
     def cell_kind(self, gid):
         return arbor.cell_kind.cable
@@ -161,5 +163,4 @@ for gid in range(ncells):
 
 df = pandas.concat(df_list, ignore_index=True)
 fig = px.line(df, x="t/ms", y="U/mV", color='Cell')
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+arbor_playground.plot(fig)
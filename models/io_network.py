@@ -1,7 +1,6 @@
 import arbor
 import random
-import pandas as pd
-import plotly.express as px
+import numpy as np
 import arbor_playground
 
 io_catalogue = arbor.load_catalogue('io-catalogue.so')
@@ -41,6 +40,14 @@ def decor_default():
         .paint('"all"', arbor.density('ca_conc', dict(initialConcentration=3.7152)))
     )
 
+# Morphology and decor are randomized per cell, the labels are shared
+@arbor_playground.cell_templates.template
+def make_labels(dend_count):
+    labels_dict = dict(LABELS_DEFAULT)
+    for i in range(dend_count):
+        labels_dict[f'gj{i}'] = '(location 0 1)'
+    return arbor.label_dict(labels_dict)
+
 class NetworkIO(arbor.recipe):
     def __init__(self, ncells):
         super().__init__()
@@ -50,38 +57,29 @@ class NetworkIO(arbor.recipe):
         self.cluster_size = 4
         self.dend_count = 10
         self.bridge_fraction = 0.1
+        # all gap junctions drawn up front, gap_junctions_on only slices a row
+        self.gj = arbor_playground.connectivity.bridge(
+            ncells, self.cluster_size, degree=(5, 10), fraction=self.bridge_fraction, seed=0)
+        rng = np.random.default_rng(0)
+        self.gj.add('i', rng.integers(0, self.dend_count, self.gj.num_edges))
+        self.gj.add('j', rng.integers(0, self.dend_count, self.gj.num_edges))
 
     def cell_description(self, gid):
         tree = arbor.segment_tree()
         soma = tree.append(arbor.mnpos, arbor.mpoint(-12, 0, 0, 12), arbor.mpoint(0, 0, 0, 12), tag=1)
         tree.append(soma, arbor.mpoint(-random.randrange(-50, -40), 0, 0, 2), arbor.mpoint(-12, 0, 0, 2), tag=2) # axon
-        labels_dict = dict(LABELS_DEFAULT)
         decor = decor_default()
         for i in range(self.dend_count):
             tree.append(soma, arbor.mpoint(6, 0, 0, 2), arbor.mpoint(random.randint(180, 250), 0, 0, 2), tag=3) # dend
-            labels_dict[f'gj{i}'] = '(location 0 1)'
             decor.place(f'"gj{i}"', arbor.junction('cx36'), f'gj{i}')
-        labels = arbor.label_dict(labels_dict)
+        labels = make_labels(self.dend_count)
         cell = arbor.cable_cell(tree, decor, labels)
         return cell
 
     def gap_junctions_on(self, gid):
         conns = []
-        # curly
-        is_bridge = random.random() < self.bridge_fraction
-        for _ in range(random.randrange(5, 10)):
-            i = random.randrange(0, self.dend_count)
-            j = random.randrange(0, self.dend_count)
-            if is_bridge:
-                other = random.randrange(0, self.num_cells() - 1)
-                if other >= gid:
-                    other += 1
-            else:
-                other = gid // self.cluster_size * self.cluster_size + random.randrange(0, self.cluster_size)
-            if not (0 <= other < self.num_cells()):
-                continue
-            print(gid, '->', other)
-            conns.append(arbor.gap_junction_connection((other, f'"gj{i}"'), f'"gj{j}"', 0.05))
+        for other, i, j in zip(self.gj.row(gid), self.gj.row(gid, 'i'), self.gj.row(gid, 'j')):
+            conns.append(arbor.gap_junction_connection((int(other), f'"gj{i}"'), f'"gj{j}"', 0.05))
         return conns
     def num_cells(self): return self.ncells
     def cell_kind(self, gid): return arbor.cell_kind.cable
@@ -89,22 +87,12 @@ class NetworkIO(arbor.recipe):
     def global_properties(self, kind): return self.props
 
 recipe = NetworkIO(ncells=16)
-sim = arbor.simulation(recipe)
-handles = [sim.sample((gid, 0), arbor.regular_schedule(1)) for gid in range(recipe.num_cells())]
-sim.run(tfinal=1000, dt=0.1)
-
-for handle in handles:
-    data, meta = sim.samples(handle)[0]
-    df = pd.DataFrame({"t/ms": data[:, 0], "U/mV": data[:, 1]})
-    fig = px.line(df, x='t/ms', y='U/mV')
-    fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-    arbor_playground.render_html(fig_html)
+print(f'{recipe.gj.num_edges} gap junctions between {recipe.ncells} cells')
+context = arbor_playground.context()
+sim = arbor.simulation(recipe, context, arbor.partition_load_balance(recipe, context))
 
-df_list = []
-for gid, handle in enumerate(handles):
-    samples, meta = sim.samples(handle)[0]
-    df_list.append(pd.DataFrame({"t/ms": samples[:, 0], "U/mV": samples[:, 1], "Cell": f"Neuron {gid}"}))
-df = pd.concat(df_list, ignore_index=True)
-fig = px.line(df, x="t/ms", y="U/mV", color='Cell')
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+# Voltages are plotted while the simulation runs
+recorder = arbor_playground.StreamingRecorder(sim, title="Inferior Olive network")
+for gid in range(recipe.num_cells()):
+    recorder.sample((gid, 0), arbor.regular_schedule(1), name=f"Neuron {gid}")
+await recorder.run(tfinal=1000, dt=0.1)
@@ -48,5 +48,4 @@ m.run(2000, 0.1)
 
 df = pd.DataFrame({"t/ms": m.traces[0].time, "U/mV": m.traces[0].value})
 fig = px.line(df, x='t/ms', y='U/mV')
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+arbor_playground.plot(fig)
@@ -17,7 +17,9 @@ import arbor_playground
 #         b2
 
 
-def make_cable_cell(gid):
+# Every cell in the network is the same, so it is built once and shared.
+@arbor_playground.cell_templates.template
+def make_cable_cell():
     # (1) Build a segment tree
     tree = arbor.segment_tree()
 
@@ -87,7 +89,7 @@ class ring_recipe(arbor.recipe):
 
     # (7) The cell_description method returns a cell
     def cell_description(self, gid):
-        return make_cable_cell(gid)
+        return make_cable_cell()
 
     # The kind method returns the type of cell with gid.
     # Note: this must agree with the type returned by cell_description.
@@ -153,5 +155,4 @@ for gid in range(ncells):
 
 df = pandas.concat(df_list, ignore_index=True)
 fig = px.line(df, x='t/ms', y='U/mV', color='Cell')
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+arbor_playground.plot(fig)
@@ -0,0 +1,41 @@
+import arbor
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import arbor_playground
+
+# Every call of firing_rate runs in one of a pool of workers. The workers
+# load this script too, but with __name__ set to "__sweep__", so the part
+# that starts the sweep has to be guarded by the if below.
+
+
+def firing_rate(current):
+    tree = arbor.segment_tree()
+    tree.append(arbor.mnpos, arbor.mpoint(-3, 0, 0, 3), arbor.mpoint(3, 0, 0, 3), tag=1)
+
+    labels = arbor.label_dict({"soma": "(tag 1)", "midpoint": "(location 0 0.5)"})
+
+    # 1 s of constant input current (nA)
+    decor = (
+        arbor.decor()
+        .set_property(Vm=-65)
+        .paint('"soma"', arbor.density("hh"))
+        .place('"midpoint"', arbor.iclamp(10, 1000, current), "iclamp")
+        .place('"midpoint"', arbor.threshold_detector(-10), "detector")
+    )
+
+    m = arbor.single_cell_model(arbor.cable_cell(tree, decor, labels))
+    m.run(tfinal=1010)
+
+    # spikes per second of stimulation
+    return len(m.spikes)
+
+
+if __name__ == "__main__":
+    currents = np.linspace(0, 0.2, 41)
+    rates = await arbor_playground.sweep(firing_rate, currents)
+
+    print("Plotting results ...")
+    df = pd.DataFrame({"I/nA": currents, "f/Hz": rates})
+    fig = px.line(df, x="I/nA", y="f/Hz", markers=True)
+    arbor_playground.plot(fig)
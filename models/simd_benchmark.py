@@ -0,0 +1,80 @@
+import os
+import time
+
+import arbor
+import pandas as pd
+import plotly.express as px
+import arbor_playground
+
+# The same Inferior Olive cell as in io_single_cell.py, run with every
+# available build of the mechanism catalogue. The simd128 build is only
+# there if the browser supports WebAssembly SIMD and it has been built
+# (see catalogue/build-cat.sh). Add ?simd=0 to the page url to run all
+# other models with the scalar builds.
+
+CATALOGUES = {
+    "scalar": "io-catalogue.scalar.so",
+    "simd128": "io-catalogue.simd128.so",
+}
+
+LABELS = {
+    'soma': '(tag 1)',
+    'axon': '(tag 2)',
+    'dend': '(tag 3)',
+    'all' : '(all)',
+    'root': '(root)'
+}
+
+
+def make_cell():
+    tree = arbor.segment_tree()
+    soma = tree.append(arbor.mnpos, arbor.mpoint(-12, 0, 0, 12), arbor.mpoint(0, 0, 0, 12), tag=1)
+    tree.append(soma, arbor.mpoint(-40, 0, 0, 2), arbor.mpoint(-12, 0, 0, 2), tag=2)
+    for _ in range(15):
+        tree.append(soma, arbor.mpoint(6, 0, 0, 2), arbor.mpoint(200, 0, 0, 2), tag=3)
+    decor = (
+        arbor.decor()
+        .paint('"soma"', arbor.density("hh"))
+        .paint('"soma"', arbor.density('na_s', dict(conductance=0.030)))
+        .paint('"soma"', arbor.density('kdr',  dict(conductance=0.030, ek=-75)))
+        .paint('"soma"', arbor.density('cal',  dict(conductance=0.045)))
+        .paint('"dend"', arbor.density('cah',  dict(conductance=0.010)))
+        .paint('"dend"', arbor.density('kca',  dict(conductance=0.220, ek=-75)))
+        .paint('"dend"', arbor.density('h',    dict(conductance=0.015, eh=-43)))
+        .paint('"dend"', arbor.density('cacc', dict(conductance=0.000)))
+        .paint('"axon"', arbor.density('na_a', dict(conductance=0.200)))
+        .paint('"axon"', arbor.density('k',    dict(conductance=0.200, ek=-75)))
+        .paint('"soma"', arbor.density('k',    dict(conductance=0.015, ek=-75)))
+        .paint('"all"',  arbor.density('leak', dict(conductance=1.3e-05, eleak=10)))
+        .set_property(cm=0.01)
+        .set_property(Vm=-65.0)
+        .paint('"all"', rL=100)
+        .paint('"all"', ion_name='ca', rev_pot=120)
+        .paint('"all"', ion_name='na', rev_pot=55)
+        .paint('"all"', ion_name='k', rev_pot=-75)
+        .paint('"all"', arbor.density('ca_conc', dict(initialConcentration=3.7152)))
+    )
+    return arbor.cable_cell(tree, decor, arbor.label_dict(LABELS))
+
+
+rows = []
+traces = []
+for build, path in CATALOGUES.items():
+    if not os.path.exists(path):
+        print(f"{build}: not available")
+        continue
+    m = arbor.single_cell_model(make_cell())
+    m.properties.catalogue.extend(arbor.load_catalogue(path), '')
+    m.probe('voltage', where='"root"', frequency=1)
+    start = time.perf_counter()
+    m.run(2000, 0.025)
+    elapsed = time.perf_counter() - start
+    print(f"{build}: {elapsed:.2f} s")
+    rows.append((build, elapsed))
+    traces.append(pd.DataFrame({"t/ms": m.traces[0].time, "U/mV": m.traces[0].value, "build": build}))
+
+df = pd.DataFrame(rows, columns=["build", "run/s"])
+arbor_playground.plot(px.bar(df, x="build", y="run/s", title="Run time per catalogue build"))
+# both builds should give the same trace
+fig = px.line(pd.concat(traces, ignore_index=True), x="t/ms", y="U/mV", color="build")
+arbor_playground.plot(fig)
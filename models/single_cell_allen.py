@@ -3,7 +3,6 @@ from collections import defaultdict
 from dataclasses import dataclass
 import json
 import arbor
-import numpy as np
 import pandas
 import plotly.express as px
 import arbor_playground
@@ -117,19 +116,41 @@ def make_cell(swc, fit):
     return arbor.cable_cell(morphology, decor, labels), offset
 
 
-# (12) Create cell, model
+# (12) Create cell and a single cell recipe, so the simulation can be run in slices
+class single_cell_recipe(arbor.recipe):
+    def __init__(self, cell):
+        arbor.recipe.__init__(self)
+        self.cell = cell
+        self.props = arbor.neuron_cable_properties()
+        # (14) Install the Allen mechanism catalogue.
+        self.props.catalogue.extend(arbor.allen_catalogue(), "")
+
+    def num_cells(self):
+        return 1
+
+    def cell_kind(self, gid):
+        return arbor.cell_kind.cable
+
+    def cell_description(self, gid):
+        return self.cell
+
+    def probes(self, gid):
+        return [arbor.cable_probe_membrane_voltage('"midpoint"')]
+
+    def global_properties(self, kind):
+        return self.props
+
+
 cell, offset = make_cell("single_cell_allen.swc", "single_cell_allen_fit.json")
-model = arbor.single_cell_model(cell)
+sim = arbor.simulation(single_cell_recipe(cell))
+sim.record(arbor.spike_recording.all)
 
 # (13) Set the probe
 # Recording frequency of neuron results is 200kHz,
 # which is done in the arbor github example as well.
 # However, in the browser environment, this really slows
 # down simulation, so we sample here at 10kHz.
-model.probe("voltage", '"midpoint"', frequency=10)
-
-# (14) Install the Allen mechanism catalogue.
-model.properties.catalogue.extend(arbor.allen_catalogue(), "")
+handle = sim.sample((0, 0), arbor.regular_schedule(0.1))
 
 # (15) Run simulation
 
@@ -137,29 +158,27 @@ print('''Running with too high dt by default!
 Please set dt=0.005 for accurate reproduction of
 neuron results. The default dt is .5 to speed up
 simulation in the interactive environment.''', file=sys.stderr)
-model.run(tfinal=1400, dt=.5)
+await arbor_playground.run(sim, tfinal=1400, dt=.5)
+trace, _ = sim.samples(handle)[0]
+spikes = sim.spikes()["time"]
 
 # (16) Load and scale reference
 
 reference = pandas.read_csv("single_cell_allen_neuron_ref.csv", index_col=0)
 reference["U/mV"] = 1000 * reference["U/mV"] + offset
 reference["Simulator"] = "Neuron"
-# Plotting 280001 datapoints is slow in the browser, so subsample
-# This can be fairly coarse grained, except around spikes
-subsample = np.zeros(reference.shape[0], dtype=bool)
-subsample[::1000] = True
-nrn_spike_idxs = np.where(np.diff(np.sign(reference['U/mV'].values+40)))[0]
-for spike_idx in nrn_spike_idxs:
-    subsample[int(spike_idx-5000):int(spike_idx+5000):10] = True
-reference = reference.iloc[subsample]
+# Plotting 280001 datapoints is slow in the browser, so downsample.
+# min/max per bucket keeps the spike peaks.
+keep = arbor_playground.sampling.minmax_indices(reference["U/mV"].values, 4000)
+reference = reference.iloc[keep]
 
 # (17) Plot
 df_list = []
 df_list.append(
     pandas.DataFrame(
         {
-            "t/ms": model.traces[0].time,
-            "U/mV": model.traces[0].value,
+            "t/ms": trace[:, 0],
+            "U/mV": trace[:, 1],
             "Simulator": "Arbor",
         }
     )
@@ -167,7 +186,7 @@ df_list.append(
 df_list.append(reference)
 df_list.append(
     pandas.DataFrame({
-        "t/ms": [0,   200, 200, 1200, 1200, max(1250, max(model.traces[0].time))],
+        "t/ms": [0,   200, 200, 1200, 1200, max(1250, trace[-1, 0])],
         "U/mV": [-110, -110, -100,  -100,  -110,  -110],
         "Simulator": "(Stimulus)"
     })
@@ -175,9 +194,8 @@ df_list.append(
 
 df = pandas.concat(df_list, ignore_index=True)
 fig = px.line(df, x="t/ms", y="U/mV", color="Simulator")
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+arbor_playground.plot(fig)
 
 print('Arbor spikes:')
-for spike in model.spikes:
+for spike in spikes:
     print(f'    {spike:.2f}ms')
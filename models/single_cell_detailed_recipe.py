@@ -186,5 +186,4 @@ for trace in range(len(fig_trace["data"])):
     fig.append_trace(fig_trace["data"][trace], row=1, col=1)
 for trace in range(len(fig_morph["data"])):
     fig.append_trace(fig_morph["data"][trace], row=1, col=2)
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+arbor_playground.plot(fig)
@@ -43,5 +43,4 @@ else:
 print("Plotting results ...")
 df = pd.DataFrame({"t/ms": m.traces[0].time, "U/mV": m.traces[0].value})
 fig = px.line(df, x='t/ms', y='U/mV')
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+arbor_playground.plot(fig)
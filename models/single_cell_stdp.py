@@ -75,31 +75,17 @@ class single_recipe(arbor.recipe):
         return self.the_props
 
 
-def run(dT, n_pairs=1):
-    recipe = single_recipe(dT, n_pairs)
+# All values of dT run side by side as cells of a single simulation
+dTs = np.arange(-20, 20, 0.5)
+ens = arbor_playground.Ensemble(single_recipe, arbor_playground.ensemble.grid(dT=dTs, n_pairs=[1]))
 
-    sim = arbor.simulation(recipe)
+# probe 4 is weight_plastic
+weights = ens.sample(4, arbor.regular_schedule(0.1))
 
-    sim.record(arbor.spike_recording.all)
+await arbor_playground.run(ens.simulation, tfinal=600)
 
-    reg_sched = arbor.regular_schedule(0.1)
-    handles = {
-        "U": sim.sample((0, 0), reg_sched),
-        "g": sim.sample((0, 1), reg_sched),
-        "apost": sim.sample((0, 2), reg_sched),
-        "apre": sim.sample((0, 3), reg_sched),
-        "weight_plastic": sim.sample((0, 4), reg_sched),
-    }
-
-    sim.run(tfinal=600)
-
-    weight_plastic, _ = sim.samples(handles["weight_plastic"])[0]
-    return weight_plastic[:, 1][-1]
-
-
-data = np.array([(dT, run(dT)) for dT in np.arange(-20, 20, 0.5)])
-df = pd.DataFrame({"t/ms": data[:, 0], "dw": data[:, 1]})
+dw = [samples[:, 1][-1] for samples in ens.samples(weights)]
+df = pd.DataFrame({"t/ms": dTs, "dw": dw})
 print("Plotting results ...")
 fig = px.scatter(df, x='t/ms', y='dw')
-fig_html = fig.to_html(include_plotlyjs=False, full_html=False)
-arbor_playground.render_html(fig_html)
+arbor_playground.plot(fig)
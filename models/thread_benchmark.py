@@ -0,0 +1,69 @@
+import time
+
+import arbor
+import pandas as pd
+import plotly.express as px
+import arbor_playground
+
+# Runs the same random LIF network with 1, 2, 4 and 8 threads. More than
+# one thread needs the pthreads build of arbor (see the README), thread
+# counts that aren't available are skipped.
+
+
+class lif_network(arbor.recipe):
+    def __init__(self, ncells, in_degree, seed=0):
+        arbor.recipe.__init__(self)
+        self.ncells = ncells
+        self.conns = arbor_playground.connectivity.fixed_indegree(
+            ncells, in_degree, sources=(0, ncells), seed=seed)
+        self.seed = seed
+
+    def num_cells(self):
+        return self.ncells
+
+    def cell_kind(self, gid):
+        return arbor.cell_kind.lif
+
+    def cell_description(self, gid):
+        cell = arbor.lif_cell("src", "tgt")
+        cell.tau_m = 10
+        cell.V_th = 10
+        cell.C_m = 20
+        cell.E_L = 0
+        cell.V_m = 0
+        cell.V_reset = 0
+        cell.t_ref = 2
+        return cell
+
+    def connections_on(self, gid):
+        return [arbor.connection((int(src), "src"), "tgt", 0.5, 1) for src in self.conns.row(gid)]
+
+    def event_generators(self, gid):
+        sched = arbor.poisson_schedule(0, 2, gid + self.seed)
+        return [arbor.event_generator("tgt", 1.2, sched)]
+
+
+recipe = lif_network(ncells=4000, in_degree=50)
+available = arbor_playground.num_threads()
+print(f"{available} threads available")
+
+rows = []
+for threads in [1, 2, 4, 8]:
+    if threads > available:
+        print(f"skipping {threads} threads")
+        continue
+    context = arbor.context(threads=threads)
+    start = time.perf_counter()
+    decomp = arbor.partition_load_balance(recipe, context)
+    sim = arbor.simulation(recipe, context, decomp)
+    setup = time.perf_counter() - start
+    start = time.perf_counter()
+    sim.run(200, 0.1)
+    run = time.perf_counter() - start
+    print(f"{threads} threads: setup {setup:.2f} s, run {run:.2f} s")
+    rows.append((threads, setup, run))
+
+df = pd.DataFrame(rows, columns=["threads", "setup/s", "run/s"])
+df["speedup"] = df["run/s"].iloc[0] / df["run/s"]
+fig = px.bar(df, x="threads", y="run/s", hover_data=["setup/s", "speedup"], title="Run time per thread count")
+arbor_playground.plot(fig)
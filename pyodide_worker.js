@@ -0,0 +1,55 @@
+/*
+ * Handle on a worker.js interpreter, see there for the message protocol.
+ *
+ * Used by the page for its interpreter, and by that interpreter for the
+ * pool of workers running arbor_playground.sweep tasks.
+ */
+
+class PyodideWorker {
+    constructor(handlers) {
+        this.handlers = handlers
+        this.pending = new Map()
+        this.next_id = 0
+        this.worker = new Worker('./worker.js')
+        // Shared with the worker's interpreter, see pyodide.setInterruptBuffer
+        this.interrupt_buffer = self.crossOriginIsolated ?
+            new Uint8Array(new SharedArrayBuffer(1)) : null
+        this.worker.onmessage = (event) => {
+            const { type, ...data } = event.data
+            if (type === 'result') {
+                const { resolve, reject } = this.pending.get(data.id)
+                this.pending.delete(data.id)
+                if (data.error !== undefined) {
+                    reject(new Error(data.error))
+                } else {
+                    resolve(data.result)
+                }
+            } else if (this.handlers[type]) {
+                this.handlers[type](data)
+            } else {
+                console.warn('Unhandled worker message', event.data)
+            }
+        }
+    }
+    abort() {
+        if (this.interrupt_buffer !== null) {
+            this.interrupt_buffer[0] = 2 // SIGINT
+        }
+        this.worker.postMessage({ type: 'abort' })
+    }
+    /* Stop the worker for good, pending requests are rejected */
+    terminate() {
+        this.worker.terminate()
+        for (const { reject } of this.pending.values()) {
+            reject(new Error('Worker terminated'))
+        }
+        this.pending.clear()
+    }
+    request(type, args={}) {
+        const id = this.next_id++
+        return new Promise((resolve, reject) => {
+            this.pending.set(id, { resolve, reject })
+            this.worker.postMessage({ id, type, ...args })
+        })
+    }
+}
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Serve the playground locally.
+
+Unlike ``python -m http.server`` this sends the cross-origin isolation
+headers needed for SharedArrayBuffer (and with it the Stop button), and
+the correct mime type for .wasm files and mechanism catalogues (.so, so
+they can be compiled with WebAssembly.compileStreaming).
+
+Usage: ./serve.py [port]
+"""
+
+import sys
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+class Handler(SimpleHTTPRequestHandler):
+    extensions_map = {
+        **SimpleHTTPRequestHandler.extensions_map,
+        ".js": "text/javascript",
+        ".wasm": "application/wasm",
+        ".so": "application/wasm",
+    }
+
+    def end_headers(self):
+        self.send_header("Cross-Origin-Opener-Policy", "same-origin")
+        self.send_header("Cross-Origin-Embedder-Policy", "credentialless")
+        super().end_headers()
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    handler = partial(Handler, directory=Path(__file__).resolve().parent)
+    with ThreadingHTTPServer(("", port), handler) as httpd:
+        print(f"Serving on http://localhost:{port}/")
+        httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
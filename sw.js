@@ -0,0 +1,250 @@
+/*
+ * Service worker.
+ *
+ * SharedArrayBuffer, which the Stop button needs to interrupt Python code,
+ * is only available to cross-origin isolated pages. Static hosts like
+ * GitHub Pages can't be configured to send the required headers, so they
+ * are added here to every same-origin response. serve.py does the same
+ * for local development.
+ *
+ * It also keeps the Pyodide distribution, the wheels and the mechanism
+ * catalogues in a cache, so warm starts don't touch the network:
+ *
+ *  - Everything listed in repodata.json, plus the CORE_ASSETS below, is
+ *    precached into a cache generation named after a digest of the
+ *    repodata sha256 fields. Packages are fetched with their sha256 as
+ *    subresource integrity, so a corrupt download fails the generation.
+ *    Core assets are best effort, the catalogues are built separately and
+ *    may be missing, those are then fetched from the network as usual.
+ *  - A generation only becomes current once it is complete, then older
+ *    generations are deleted. Until then the previous one keeps serving,
+ *    so updates are atomic.
+ *  - Precached files are served cache-first. repodata.json is fetched
+ *    network-first (Pyodide loads it on every start), a changed digest
+ *    starts building the next generation.
+ *  - Other same-origin files (the page itself, scripts, models) are
+ *    fetched network-first and fall back to the last cached copy offline.
+ *
+ * Mechanism catalogues (.so) are served as application/wasm, which
+ * WebAssembly.compileStreaming requires.
+ */
+
+const ISOLATION_HEADERS = {
+    'Cross-Origin-Opener-Policy': 'same-origin',
+    // credentialless instead of require-corp so plotly from the CDN and
+    // the arbor logo still load without CORP headers
+    'Cross-Origin-Embedder-Policy': 'credentialless',
+}
+
+// Not in repodata.json, bump CORE_ASSETS_VERSION when any of these change
+const CORE_ASSETS_VERSION = 3
+const CORE_ASSETS = [
+    'pyodide.js',
+    'pyodide.asm.js',
+    'pyodide.asm.wasm',
+    'pyodide_py.tar',
+    'plotly-5.0.0-py2.py3-none-any.whl',
+    'catalogue/io-catalogue.so',
+]
+
+const PACKAGES_CACHE_PREFIX = 'arbor-playground-packages-'
+const SHELL_CACHE = 'arbor-playground-shell'
+const META_CACHE = 'arbor-playground-meta'
+const CURRENT_KEY = 'current-generation'
+
+let current = null // { name, urls: Set }
+let updating = null
+
+function with_isolation_headers(response, url) {
+    if (response.status === 0) {
+        return response // opaque, can't be modified
+    }
+    const headers = new Headers(response.headers)
+    for (const [key, value] of Object.entries(ISOLATION_HEADERS)) {
+        headers.set(key, value)
+    }
+    if (new URL(url).pathname.endsWith('.so')) {
+        headers.set('Content-Type', 'application/wasm')
+    }
+    return new Response(response.body, {
+        status: response.status,
+        statusText: response.statusText,
+        headers,
+    })
+}
+
+function scope_url(path) {
+    return new URL(path, self.registration.scope).href
+}
+
+function sri(sha256_hex) {
+    const bytes = sha256_hex.match(/../g).map(h => parseInt(h, 16))
+    return 'sha256-' + btoa(String.fromCharCode(...bytes))
+}
+
+async function generation_name(repodata) {
+    const keys = Object.values(repodata.packages)
+        .map(pkg => pkg.file_name + ':' + pkg.sha256)
+        .sort()
+    keys.push('core:' + CORE_ASSETS_VERSION)
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(keys.join('\n')))
+    const hex = Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('')
+    return PACKAGES_CACHE_PREFIX + hex.slice(0, 16)
+}
+
+function package_requests(repodata) {
+    return Object.values(repodata.packages).map(pkg =>
+        new Request(scope_url(pkg.file_name), { integrity: sri(pkg.sha256), cache: 'no-cache' }))
+}
+
+function core_requests() {
+    return CORE_ASSETS.map(path => new Request(scope_url(path), { cache: 'no-cache' }))
+}
+
+async function precache(cache, request) {
+    const response = await fetch(request)
+    if (!response.ok) {
+        throw new Error(`${request.url}: ${response.status}`)
+    }
+    await cache.put(request.url, response)
+    return request.url
+}
+
+async function load_current() {
+    if (current !== null) return current
+    const meta = await caches.open(META_CACHE)
+    const response = await meta.match(CURRENT_KEY)
+    if (response === undefined) return null
+    const { name, urls } = await response.json()
+    current = { name, urls: new Set(urls) }
+    return current
+}
+
+async function build_generation(repodata_text) {
+    const repodata = JSON.parse(repodata_text)
+    const name = await generation_name(repodata)
+    const active = await load_current()
+    if (active !== null && active.name === name) return
+    // Start from scratch, a previous attempt may have left a partial cache
+    await caches.delete(name)
+    const cache = await caches.open(name)
+    const urls = []
+    try {
+        const core = Promise.allSettled(core_requests().map(request => precache(cache, request)))
+        urls.push(...await Promise.all(package_requests(repodata).map(request => precache(cache, request))))
+        for (const result of await core) {
+            if (result.status === 'fulfilled') {
+                urls.push(result.value)
+            } else {
+                console.warn('Not precached', result.reason)
+            }
+        }
+        await cache.put(scope_url('repodata.json'), new Response(repodata_text, {
+            headers: { 'Content-Type': 'application/json' },
+        }))
+    } catch (error) {
+        await caches.delete(name)
+        throw error
+    }
+    urls.push(scope_url('repodata.json'))
+    const meta = await caches.open(META_CACHE)
+    await meta.put(CURRENT_KEY, new Response(JSON.stringify({ name, urls })))
+    current = { name, urls: new Set(urls) }
+    for (const key of await caches.keys()) {
+        if (key.startsWith(PACKAGES_CACHE_PREFIX) && key !== name) {
+            await caches.delete(key)
+        }
+    }
+}
+
+function update(repodata_text) {
+    // one generation build at a time, a newer repodata waits for the previous build
+    const previous = updating || Promise.resolve()
+    updating = previous
+        .then(() => build_generation(repodata_text))
+        .catch(error => console.warn('Precaching failed, keeping the previous cache', error))
+        .finally(() => { updating = null })
+    return updating
+}
+
+async function fetch_repodata(request) {
+    try {
+        const response = await fetch(request, { cache: 'no-cache' })
+        if (response.ok) {
+            const text = await response.clone().text()
+            return [response, update(text)]
+        }
+        return [response, null]
+    } catch (error) {
+        const active = await load_current()
+        if (active !== null) {
+            const cached = await caches.match(scope_url('repodata.json'), { cacheName: active.name })
+            if (cached !== undefined) return [cached, null]
+        }
+        throw error
+    }
+}
+
+async function cache_first(request) {
+    const active = await load_current()
+    if (active !== null && active.urls.has(request.url)) {
+        const cached = await caches.match(request.url, { cacheName: active.name })
+        if (cached !== undefined) return cached
+    }
+    return null
+}
+
+async function network_first(request) {
+    const shell = await caches.open(SHELL_CACHE)
+    try {
+        const response = await fetch(request)
+        if (response.ok) {
+            await shell.put(request, response.clone())
+        }
+        return response
+    } catch (error) {
+        const cached = await shell.match(request)
+        if (cached !== undefined) return cached
+        throw error
+    }
+}
+
+async function respond(event) {
+    const request = event.request
+    const url = new URL(request.url)
+    url.search = ''
+    if (url.href === scope_url('repodata.json')) {
+        const [response, pending] = await fetch_repodata(request)
+        if (pending !== null) {
+            event.waitUntil(pending)
+        }
+        return response
+    }
+    const cached = await cache_first(request)
+    if (cached !== null) return cached
+    return network_first(request)
+}
+
+self.addEventListener('install', () => {
+    // Precaching starts when Pyodide first fetches repodata.json through
+    // us, so a first visit doesn't download everything twice.
+    self.skipWaiting()
+})
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(self.clients.claim())
+})
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request
+    if (request.method !== 'GET') {
+        return
+    }
+    if (request.cache === 'only-if-cached' && request.mode !== 'same-origin') {
+        return
+    }
+    if (new URL(request.url).origin !== self.location.origin) {
+        return
+    }
+    event.respondWith(respond(event).then(response => with_isolation_headers(response, request.url)))
+})
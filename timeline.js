@@ -0,0 +1,148 @@
+/*
+ * Timeline of the boot and run phases.
+ *
+ * A phase is recorded as a performance.measure, so it shows up in the
+ * performance panel of the browser's devtools, and handed to the listener
+ * set with on_phase as { name, start, duration, ...detail }, times in ms
+ * of performance.now(). worker.js forwards its phases to the page along
+ * with its performance.timeOrigin, page_phase moves them onto the page's
+ * clock. The page shows them in the Timeline dialog (TimelinePanel).
+ */
+
+let phase_listener = () => {}
+
+function on_phase(listener) {
+    phase_listener = listener
+}
+
+/* Record a phase from start to end, performance.now() times */
+function record_phase(name, start, end, detail={}) {
+    try {
+        performance.measure(name, { start, end, detail })
+    } catch (error) {
+        // browsers without the options argument of performance.measure
+    }
+    phase_listener({ name, start, duration: end - start, ...detail })
+}
+
+/* Start a phase now, returns the function that ends it */
+function begin_phase(name, detail={}) {
+    const start = performance.now()
+    return () => record_phase(name, start, performance.now(), detail)
+}
+
+async function timed_phase(name, fn, detail={}) {
+    const end = begin_phase(name, detail)
+    try {
+        return await fn()
+    } finally {
+        end()
+    }
+}
+
+/* Phases of a worker, sent with its own time origin, on the page's clock */
+function page_phase(phase, time_origin) {
+    return { ...phase, start: phase.start + time_origin - performance.timeOrigin }
+}
+
+/* Waterfall of the boot phases and those of the last run, with an export
+ * of everything recorded as JSON */
+class TimelinePanel {
+    constructor(el) {
+        this.el = el
+        this.boot = []
+        this.runs = []
+        this.frame_requested = false
+    }
+
+    add(phase) {
+        if (phase.run === undefined || phase.run === null) {
+            this.boot.push(phase)
+        } else {
+            let run = this.runs.find(run => run.id === phase.run)
+            if (run === undefined) {
+                run = { id: phase.run, phases: [] }
+                this.runs.push(run)
+            }
+            run.phases.push(phase)
+        }
+        this.schedule()
+    }
+
+    schedule() {
+        if (this.frame_requested) return
+        this.frame_requested = true
+        requestAnimationFrame(() => {
+            this.frame_requested = false
+            this.render()
+        })
+    }
+
+    render() {
+        if (this.el.offsetParent === null) return // hidden, rendered when shown
+        const groups = [['Boot', this.boot]]
+        if (this.runs.length > 0) {
+            const run = this.runs[this.runs.length - 1]
+            groups.push([`Run ${run.id}`, run.phases])
+        }
+        const fragment = document.createDocumentFragment()
+        for (const [title, phases] of groups) {
+            fragment.appendChild(this.render_group(title, phases))
+        }
+        this.el.replaceChildren(fragment)
+    }
+
+    render_group(title, phases) {
+        const group = document.createElement('div')
+        group.className = 'timeline-group'
+        const t0 = Math.min(...phases.map(p => p.start))
+        const t1 = Math.max(...phases.map(p => p.start + p.duration))
+        const span = Math.max(t1 - t0, 1)
+        const header = document.createElement('h3')
+        header.textContent = phases.length === 0 ? title : `${title} (${format_ms(t1 - t0)})`
+        group.appendChild(header)
+        for (const phase of [...phases].sort((a, b) => a.start - b.start)) {
+            const row = document.createElement('div')
+            row.className = 'timeline-row'
+            const label = document.createElement('span')
+            label.className = 'timeline-label'
+            label.textContent = phase.name
+            label.title = `${phase.name} (${phase.source}) ${format_ms(phase.duration)}`
+            const track = document.createElement('span')
+            track.className = 'timeline-track'
+            const bar = document.createElement('span')
+            bar.className = 'timeline-bar ' + phase.source
+            bar.style.left = (100 * (phase.start - t0) / span) + '%'
+            bar.style.width = Math.max(100 * phase.duration / span, 0.2) + '%'
+            track.appendChild(bar)
+            const duration = document.createElement('span')
+            duration.className = 'timeline-duration'
+            duration.textContent = format_ms(phase.duration)
+            row.append(label, track, duration)
+            group.appendChild(row)
+        }
+        return group
+    }
+
+    to_json() {
+        return JSON.stringify({
+            time_origin: performance.timeOrigin,
+            user_agent: navigator.userAgent,
+            boot: this.boot,
+            runs: this.runs,
+        }, null, 2)
+    }
+
+    download() {
+        const blob = new Blob([this.to_json()], { type: 'application/json' })
+        const a = document.createElement('a')
+        a.href = URL.createObjectURL(blob)
+        a.download = 'arbor-playground-timeline.json'
+        a.click()
+        setTimeout(() => URL.revokeObjectURL(a.href), 1000)
+    }
+}
+
+function format_ms(ms) {
+    return ms >= 1000 ? (ms / 1000).toFixed(2) + ' s' : ms.toFixed(1) + ' ms'
+}
@@ -0,0 +1,295 @@
+#!/usr/bin/env node
+/*
+ * Headless benchmark of the models in models.js.
+ *
+ * Every model runs in a fresh Pyodide with the same wheels, catalogues
+ * and arbor_playground package as the page. Per model this records the
+ * boot phases, the time spent constructing simulations (which is where
+ * recipes are built), running them and plotting, the total run time and
+ * the size of the WebAssembly heap afterwards (it never shrinks, so this
+ * is its peak). The page itself is replaced by stubs of the
+ * arbor_playground_js module: plots are converted but not drawn, sweeps
+ * run one task after the other.
+ *
+ * Usage: node tools/benchmark.js [options]
+ *   --out FILE         write results here (default benchmark/results.json)
+ *   --baseline FILE    compare against this (default benchmark/baseline.json)
+ *   --threshold X      allowed relative slowdown (default 0.2)
+ *   --update-baseline  store the results as the new baseline
+ *   --all              include models that aren't enabled
+ *   --only TEXT        only models whose url or title contains TEXT
+ * Exits with status 1 if a model failed or a metric regressed.
+ *
+ * Timings depend on the machine, so there is no baseline in the
+ * repository: create one with --update-baseline on the machine that
+ * compares against it. Without a baseline the benchmark refuses to run.
+ * Needs the complete Pyodide distribution, like tools/build-snapshot.js.
+ */
+
+const fs = require('fs')
+const path = require('path')
+const { performance } = require('perf_hooks')
+const { loadPyodide } = require('../pyodide.js')
+const { MODELS } = require('../models.js')
+
+const ROOT = path.resolve(__dirname, '..')
+
+// keep in sync with worker.js
+const BOOT_PACKAGES = ['arbor']
+const EXTRA_PACKAGES = { plotly: ['tenacity', 'plotly-5.0.0-py2.py3-none-any.whl'] }
+
+// compared against the baseline, in seconds unless noted
+const METRICS = ['boot', 'run', 'simulation_init', 'simulation_run', 'plot', 'heap_bytes']
+// differences below these are noise
+const MIN_DIFFERENCE = { heap_bytes: 1 << 20 }
+const DEFAULT_MIN_DIFFERENCE = 0.05
+
+// Times what models do, installed before each script runs
+const INSTRUMENT = `
+import time
+import arbor
+import arbor_playground
+
+timings = {"simulation_init": 0.0, "simulation_run": 0.0, "plot": 0.0}
+
+def _timed(key, fn):
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[key] += time.perf_counter() - start
+    return timed
+
+class simulation(arbor.simulation):
+    def __init__(self, *args, **kwargs):
+        _timed("simulation_init", super().__init__)(*args, **kwargs)
+
+    def run(self, *args, **kwargs):
+        return _timed("simulation_run", super().run)(*args, **kwargs)
+
+class single_cell_model(arbor.single_cell_model):
+    def run(self, *args, **kwargs):
+        return _timed("simulation_run", super().run)(*args, **kwargs)
+
+arbor.simulation = simulation
+arbor.single_cell_model = single_cell_model
+for name in ["plot", "raster", "render_html"]:
+    setattr(arbor_playground, name, _timed("plot", getattr(arbor_playground, name)))
+`
+
+function parse_args(argv) {
+    const args = {
+        out: path.join(ROOT, 'benchmark', 'results.json'),
+        baseline: path.join(ROOT, 'benchmark', 'baseline.json'),
+        threshold: 0.2,
+        update_baseline: false,
+        all: false,
+        only: null,
+    }
+    for (let i = 0; i < argv.length; i++) {
+        switch (argv[i]) {
+            case '--out': args.out = path.resolve(argv[++i]); break
+            case '--baseline': args.baseline = path.resolve(argv[++i]); break
+            case '--threshold': args.threshold = parseFloat(argv[++i]); break
+            case '--update-baseline': args.update_baseline = true; break
+            case '--all': args.all = true; break
+            case '--only': args.only = argv[++i]; break
+            default: throw new Error('Unknown argument ' + argv[i])
+        }
+    }
+    return args
+}
+
+function seconds(start) {
+    return (performance.now() - start) / 1000
+}
+
+function stub_module(state) {
+    return {
+        write(stream, text) {
+            state.output.push(text)
+        },
+        render_html() {},
+        plot() {},
+        extend() {},
+        progress() {},
+        abort_requested() {
+            return false
+        },
+        thread_count() {
+            return 1
+        },
+        now() {
+            return performance.now()
+        },
+        heap_size() {
+            return state.pyodide._module.HEAP8.length
+        },
+        meter_report() {},
+        phase(name, start, end) {
+            state.phases[name] = (state.phases[name] || 0) + (end - start) / 1000
+        },
+        async sweep(name, payloads) {
+            const sweep = state.pyodide.pyimport('arbor_playground.sweep')
+            const results = []
+            for (const payload of payloads) {
+                const reply = await sweep._call(state.namespace, name, payload)
+                results.push(reply.toJs())
+                reply.destroy()
+            }
+            sweep.destroy()
+            return results
+        },
+    }
+}
+
+async function read_file(file) {
+    const url = file.url !== undefined ? file.url : file.simd_url
+    if (/^https?:/.test(url)) {
+        const r = await fetch(url)
+        if (!r.ok) throw new Error(`${url}: ${r.status}`)
+        return new Uint8Array(await r.arrayBuffer())
+    }
+    return fs.readFileSync(path.join(ROOT, url))
+}
+
+async function run_model(model) {
+    const result = { title: model.title, ok: false, boot_phases: {} }
+    const boot = result.boot_phases
+    const state = { output: [], pyodide: null, namespace: null, phases: {} }
+    const code = fs.readFileSync(path.join(ROOT, model.url), 'utf8')
+
+    let start = performance.now()
+    const pyodide = await loadPyodide({ indexURL: ROOT + path.sep, stdout: () => {}, stderr: () => {} })
+    state.pyodide = pyodide
+    boot.load_pyodide = seconds(start)
+
+    start = performance.now()
+    await pyodide.loadPackage(BOOT_PACKAGES)
+    const imports = pyodide.pyodide_py.code.find_imports(code).toJs()
+    const extra = imports.flatMap(name => EXTRA_PACKAGES[name] || [])
+        .map(name => name.endsWith('.whl') ? path.join(ROOT, name) : name)
+    if (extra.length > 0) await pyodide.loadPackage(extra)
+    await pyodide.loadPackagesFromImports(code)
+    boot.load_packages = seconds(start)
+
+    start = performance.now()
+    pyodide.registerJsModule('arbor_playground_js', stub_module(state))
+    const site = pyodide.runPython('import sysconfig; sysconfig.get_paths()["purelib"]')
+    pyodide.FS.mkdirTree(site + '/arbor_playground')
+    for (const name of fs.readdirSync(path.join(ROOT, 'arbor_playground'))) {
+        if (name.endsWith('.py')) {
+            pyodide.FS.writeFile(`${site}/arbor_playground/${name}`,
+                fs.readFileSync(path.join(ROOT, 'arbor_playground', name), 'utf8'))
+        }
+    }
+    pyodide.FS.chdir('/home/pyodide')
+    for (const file of model.filesystem || []) {
+        if (file.url === undefined && file.optional) continue
+        try {
+            pyodide.FS.writeFile(file.path, await read_file(file))
+        } catch (error) {
+            if (!file.optional) throw error
+        }
+    }
+    const instrument = pyodide.toPy({})
+    pyodide.runPython(INSTRUMENT, { globals: instrument })
+    boot.install = seconds(start)
+    result.boot = Object.values(boot).reduce((a, b) => a + b, 0)
+    result.pyodide_version = pyodide.version
+
+    state.namespace = pyodide.toPy({ __name__: '__main__' })
+    pyodide.globals.set('code_to_run', code)
+    pyodide.globals.set('namespace', state.namespace)
+    start = performance.now()
+    try {
+        await pyodide.runPythonAsync([
+            'from pyodide.code import eval_code_async',
+            'await eval_code_async(code_to_run, namespace, filename="main.py")',
+        ].join('\n'))
+        result.ok = true
+    } catch (error) {
+        result.error = ('' + error).split('\n').slice(-3).join('\n')
+    }
+    result.run = seconds(start)
+    const timings = instrument.get('timings')
+    Object.assign(result, timings.toJs({ dict_converter: Object.fromEntries }))
+    timings.destroy()
+    // arbor_playground.phase totals, informational
+    result.phases = state.phases
+    result.heap_bytes = pyodide._module.HEAP8.length
+    return result
+}
+
+function compare(results, baseline, threshold) {
+    const regressions = []
+    for (const [url, current] of Object.entries(results.models)) {
+        const previous = baseline.models[url]
+        if (previous === undefined || !previous.ok) continue
+        if (!current.ok) {
+            regressions.push(`${url}: failed (${current.error})`)
+            continue
+        }
+        for (const metric of METRICS) {
+            const [now, before] = [current[metric], previous[metric]]
+            if (now === undefined || before === undefined) continue
+            const min_difference = MIN_DIFFERENCE[metric] || DEFAULT_MIN_DIFFERENCE
+            if (now > before * (1 + threshold) && now - before > min_difference) {
+                regressions.push(`${url}: ${metric} ${format(metric, before)} -> ${format(metric, now)}`)
+            }
+        }
+    }
+    return regressions
+}
+
+function format(metric, value) {
+    return metric === 'heap_bytes' ? `${(value / (1 << 20)).toFixed(1)} MiB` : `${value.toFixed(3)} s`
+}
+
+async function main() {
+    const args = parse_args(process.argv.slice(2))
+    if (!args.update_baseline && !fs.existsSync(args.baseline)) {
+        console.error(`No baseline at ${args.baseline}, create one on this machine first with\n` +
+            `    node tools/benchmark.js --update-baseline`)
+        process.exit(1)
+    }
+    const models = MODELS.filter(model => !model.is_header)
+        .filter(model => args.all || model.enabled)
+        .filter(model => args.only === null || model.url.includes(args.only) || model.title.includes(args.only))
+    const results = { date: new Date().toISOString(), node: process.version, models: {} }
+    let failed = false
+    for (const model of models) {
+        process.stdout.write(`${model.url} ... `)
+        const result = await run_model(model)
+        results.models[model.url] = result
+        if (result.ok) {
+            console.log(`run ${format('run', result.run)}, heap ${format('heap_bytes', result.heap_bytes)}`)
+        } else {
+            failed = true
+            console.log(`failed\n${result.error}`)
+        }
+    }
+    fs.mkdirSync(path.dirname(args.out), { recursive: true })
+    fs.writeFileSync(args.out, JSON.stringify(results, null, 4) + '\n')
+    console.log(`Wrote ${args.out}`)
+
+    if (args.update_baseline) {
+        fs.mkdirSync(path.dirname(args.baseline), { recursive: true })
+        fs.writeFileSync(args.baseline, JSON.stringify(results, null, 4) + '\n')
+        console.log(`Wrote ${args.baseline}`)
+    } else {
+        const regressions = compare(results, JSON.parse(fs.readFileSync(args.baseline, 'utf8')), args.threshold)
+        for (const line of regressions) {
+            console.log('REGRESSION ' + line)
+        }
+        if (regressions.length > 0) failed = true
+        else console.log(`No regressions against ${args.baseline}`)
+    }
+    process.exit(failed ? 1 : 0)
+}
+
+main().catch(error => {
+    console.error(error)
+    process.exit(1)
+})
@@ -0,0 +1,70 @@
+#!/usr/bin/env node
+/*
+ * Build snapshot/ for the interpreter worker (worker.js).
+ *
+ * Pyodide 0.22 can't dump and restore interpreter memory, so the snapshot
+ * is the next best thing: site-packages after installing BOOT_PACKAGES and
+ * importing them once, with every module byte-compiled. The worker unpacks
+ * this single archive instead of resolving, downloading and unpacking each
+ * package, and imports skip compiling the sources.
+ *
+ * Usage: node tools/build-snapshot.js
+ * Needs the complete Pyodide distribution (including pyodide.asm.wasm)
+ * and all wheels next to index.html. Rebuild after changing any of them.
+ */
+
+const fs = require('fs')
+const path = require('path')
+const { loadPyodide } = require('../pyodide.js')
+
+const ROOT = path.resolve(__dirname, '..')
+const OUT = path.join(ROOT, 'snapshot')
+
+// keep in sync with BOOT_PACKAGES in worker.js
+const BOOT_PACKAGES = [
+    'arbor',
+]
+
+const IMPORTS = ['arbor', 'numpy']
+
+const BUILD = `
+import compileall, json, os, py_compile, sysconfig, tarfile
+${IMPORTS.map(name => `import ${name}`).join('\n')}
+
+site = sysconfig.get_paths()["purelib"]
+# unchecked: the archive is only ever used with the sources it contains
+compileall.compile_dir(
+    site, quiet=1, invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+dynlibs = sorted(
+    os.path.join(root, name)
+    for root, _, files in os.walk(site)
+    for name in files if name.endswith(".so"))
+with tarfile.open("/tmp/site-packages.tar", "w") as tar:
+    for name in sorted(os.listdir(site)):
+        if name != "arbor_playground":
+            tar.add(os.path.join(site, name), arcname=name)
+json.dumps(dynlibs)
+`
+
+async function main() {
+    const pyodide = await loadPyodide({ indexURL: ROOT + path.sep })
+    await pyodide.loadPackage(BOOT_PACKAGES.map(name =>
+        name.endsWith('.whl') ? path.join(ROOT, name) : name))
+    const dynlibs = JSON.parse(pyodide.runPython(BUILD))
+    fs.mkdirSync(OUT, { recursive: true })
+    fs.writeFileSync(path.join(OUT, 'site-packages.tar'), pyodide.FS.readFile('/tmp/site-packages.tar'))
+    const manifest = {
+        pyodide_version: pyodide.version,
+        archive: 'site-packages.tar',
+        packages: Object.keys(pyodide.loadedPackages),
+        imports: IMPORTS,
+        dynlibs,
+    }
+    fs.writeFileSync(path.join(OUT, 'manifest.json'), JSON.stringify(manifest, null, 4) + '\n')
+    console.log(`Wrote ${OUT} (${manifest.packages.length} packages, ${dynlibs.length} dynlibs)`)
+}
+
+main().catch(error => {
+    console.error(error)
+    process.exit(1)
+})
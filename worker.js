@@ -0,0 +1,687 @@
+/*
+ * Pyodide interpreter worker.
+ *
+ * Everything that touches the interpreter lives here so long simulations
+ * don't block the page. The main thread (index.js) talks to this worker
+ * with request messages { id, type, ...args } and gets back a
+ * { type: 'result', id, result } or { type: 'result', id, error } reply.
+ * Besides replies, the worker emits unsolicited messages:
+ *
+ *   { type: 'output', stream, text }  a chunk of 'stdout' or 'stderr' text
+ *   { type: 'render_html', html }     html produced by arbor_playground.render_html
+ *   { type: 'plot', id, data, layout }
+ *                                     a figure from arbor_playground.plot, numeric
+ *                                     arrays are typed arrays
+ *   { type: 'extend', id, x, y, indices, max_points }
+ *                                     new points for traces indices of plot id,
+ *                                     from arbor_playground.StreamingRecorder
+ *   { type: 'progress', t, tfinal, rate, eta, heap }
+ *                                     simulation progress from arbor_playground.run,
+ *                                     heap is the size of WebAssembly memory
+ *   { type: 'meter_report', report }
+ *                                     arbor meter checkpoints and heap sizes of the
+ *                                     run, see arbor_playground/meters.py
+ *   { type: 'phase', phase, time_origin }
+ *                                     a timed phase of the boot or, with the run_id
+ *                                     of the run request in phase.run, of a run,
+ *                                     see timeline.js and arbor_playground.phase
+ *
+ * An { type: 'abort' } message is not queued but handled immediately, it
+ * makes arbor_playground.run raise KeyboardInterrupt after its current slice.
+ * When the page is cross-origin isolated, init also receives a shared
+ * interrupt buffer. The page writes SIGINT (2) into it on Stop, which
+ * raises KeyboardInterrupt in any running Python code as well.
+ *
+ * arbor_playground.sweep runs its tasks on a pool of further instances of
+ * this worker, started from here on first use and kept for later runs.
+ * They get the files of the model and { type: 'sweep_task', code, name,
+ * payload } requests, see arbor_playground/sweep.py.
+ *
+ * Mechanism catalogues (.so files written by write_files) are compiled
+ * here, while downloading or from the asset store, not by dlopen in
+ * arbor.load_catalogue, see preload_dynlib.
+ */
+
+importScripts('./pyodide.js', './pyodide_worker.js', './assets.js', './timeline.js')
+
+// Files of the arbor_playground python package, installed into site-packages
+const PLAYGROUND_FILES = [
+    '__init__.py',
+    '_stdio.py',
+    'runner.py',
+    'plotting.py',
+    'sampling.py',
+    'connectivity.py',
+    'cell_templates.py',
+    'ensemble.py',
+    'sweep.py',
+    'threads.py',
+    'streaming.py',
+    'raster.py',
+    'timeline.py',
+    'profiling.py',
+    'meters.py',
+    'notebook.py',
+]
+
+// Loaded at startup, keep in sync with tools/build-snapshot.js. Everything
+// else is loaded on demand from the imports of each script (load_imports).
+const BOOT_PACKAGES = [
+    'arbor',
+]
+
+// Modules whose package isn't in repodata.json, and the packages they need
+const EXTRA_PACKAGES = {
+    plotly: ['tenacity', 'plotly'],
+}
+
+// Packages loaded from a url instead of by name
+const PACKAGE_URLS = {
+    plotly: 'plotly-5.0.0-py2.py3-none-any.whl',
+}
+
+// A module with a single v128 instruction only validates with simd128 support
+const SIMD_SUPPORTED = WebAssembly.validate(new Uint8Array([
+    0, 97, 115, 109, 1, 0, 0, 0, 1, 5, 1, 96, 0, 1, 123, 3, 2, 1, 0, 10, 10, 1, 8, 0,
+    65, 0, 253, 15, 253, 98, 11]))
+
+let pyodide = null
+let use_simd = SIMD_SUPPORTED
+let assets = null
+let flush_python_output = null
+let abort_requested = false
+let interrupt_buffer = null
+let plot_counter = 0
+let plot_prefix = ''
+let current_code = null
+let written_files = new Map() // path -> latest file written there
+let pool = []
+let current_run = null
+
+function post(type, data={}, transfer=[]) {
+    self.postMessage({ type, ...data }, transfer)
+}
+
+function typed_array_buffers(value, buffers=[]) {
+    if (ArrayBuffer.isView(value)) {
+        buffers.push(value.buffer)
+    } else if (Array.isArray(value)) {
+        value.forEach(v => typed_array_buffers(v, buffers))
+    } else if (value !== null && typeof value === 'object') {
+        Object.values(value).forEach(v => typed_array_buffers(v, buffers))
+    }
+    return buffers
+}
+
+function transferables(value) {
+    return [...new Set(typed_array_buffers(value))]
+}
+
+/* Output is coalesced here and posted at most about once per frame, the
+ * main thread splits it into lines. Python's own streams already batch (see
+ * arbor_playground/_stdio.py) and are posted at once, this catches the
+ * per-line C level writes. */
+let output = {
+    chunks: [],
+    stream: null,
+    last_post: 0,
+    timer: null,
+    write(stream, text) {
+        if (stream !== this.stream) {
+            this.flush()
+            this.stream = stream
+        }
+        this.chunks.push(text)
+        if (performance.now() - this.last_post > 16) {
+            this.flush()
+        } else if (this.timer === null) {
+            this.timer = setTimeout(() => this.flush(), 16)
+        }
+    },
+    flush() {
+        if (this.timer !== null) {
+            clearTimeout(this.timer)
+            this.timer = null
+        }
+        this.last_post = performance.now()
+        if (this.chunks.length === 0) return
+        post('output', { stream: this.stream, text: this.chunks.join('') })
+        this.chunks = []
+    },
+}
+
+on_phase(phase => post('phase', {
+    phase: { run: current_run, ...phase },
+    time_origin: performance.timeOrigin,
+}))
+
+function message_ok(msg) {
+    output.write('stdout', msg + '\n')
+}
+
+function message_err(msg) {
+    output.write('stderr', msg + '\n')
+}
+
+let plot_module = {
+    write(stream, text) {
+        // already batched by _stdio, post it now
+        output.write(stream, text)
+        output.flush()
+    },
+    schedule_flush(seconds) {
+        // runs once the script yields, or after it finished
+        setTimeout(() => flush_python_output(), seconds * 1000)
+    },
+    render_html(html) {
+        output.flush()
+        post('render_html', { html })
+    },
+    plot(id, data, layout) {
+        output.flush()
+        if (id === null || id === undefined) {
+            id = plot_prefix + 'plot-' + plot_counter++
+        }
+        // to_js made fresh copies, hand them over instead of copying again
+        post('plot', { id, data, layout }, transferables([data, layout]))
+    },
+    extend(id, x, y, indices, max_points) {
+        output.flush()
+        post('extend', { id, x, y, indices, max_points }, transferables([x, y]))
+    },
+    progress(t, tfinal, rate, eta) {
+        post('progress', { t, tfinal, rate, eta, heap: heap_size() })
+    },
+    abort_requested() {
+        return abort_requested
+    },
+    thread_count() {
+        // More than one thread needs a pyodide and arbor built with
+        // -pthread (see README), and shared memory for its workers
+        if (!self.crossOriginIsolated || pyodide._module.PThread === undefined) return 1
+        return navigator.hardwareConcurrency || 1
+    },
+    sweep(name, payloads, workers) {
+        return sweep(name, payloads, workers)
+    },
+    now() {
+        return performance.now()
+    },
+    heap_size() {
+        return heap_size()
+    },
+    begin_cell(index) {
+        // charts numbered per cell, so a cell running again updates its own
+        plot_prefix = `cell-${index}-`
+        plot_counter = 0
+    },
+    meter_report(json) {
+        output.flush()
+        post('meter_report', { report: JSON.parse(json) })
+    },
+    phase(name, start, end) {
+        record_phase(name, start, end, { source: 'python' })
+    },
+}
+
+/* Bytes of WebAssembly memory, it grows but never shrinks */
+function heap_size() {
+    return pyodide._module.HEAP8.length
+}
+
+function format_python_error(error) {
+    const traceback = pyodide.pyimport('traceback')
+    const lines = traceback.format_exception(error)
+    let frames = []
+    for (let i = 0; i < lines.__len__(); i++) {
+        frames.push(...(lines.get(i).split('\n')))
+    }
+    lines.destroy()
+    let filtered_frames = ['PythonError: Traceback (most recent call last)']
+    let skip = true
+    for (let i = 1; i < frames.length; i++) {
+        if (frames[i].indexOf("main.py") !== -1) {
+            skip = false
+        }
+        if (!skip) {
+            filtered_frames.push(frames[i])
+        }
+    }
+    return filtered_frames.join('\n')
+}
+
+function extra_packages(modules) {
+    return modules.flatMap(name => EXTRA_PACKAGES[name] || [])
+        .filter(pkg => pyodide.loadedPackages[pkg] === undefined)
+        .map(pkg => PACKAGE_URLS[pkg] || pkg)
+}
+
+/* Load the packages the imports of code need, before it runs */
+async function load_imports(code) {
+    let found
+    try {
+        found = pyodide.pyodide_py.code.find_imports(code)
+    } catch (error) {
+        if (error.type === 'SyntaxError') return // running the code reports it
+        throw error
+    }
+    const imports = found.toJs()
+    found.destroy()
+    const end = begin_phase('load imports', { source: 'worker' })
+    const extra = extra_packages(imports)
+    if (extra.length > 0) {
+        await pyodide.loadPackage(extra, message_ok, message_err)
+    }
+    await pyodide.loadPackagesFromImports(code, message_ok, message_err)
+    end()
+    output.flush()
+}
+
+/* Scripts with # %% cells only run the cells that changed, unless
+ * reset_cells, see arbor_playground/notebook.py. With profile, the script
+ * runs under cProfile, see arbor_playground/profiling.py. With meters,
+ * arbor calls are metered, see arbor_playground/meters.py. */
+async function run_code(code, { profile = false, meters = false, reset_cells = false } = {}) {
+    let result = { ok: true }
+    abort_requested = false
+    plot_counter = 0
+    plot_prefix = ''
+    // before any Python runs, a Stop of an earlier run must not interrupt this one
+    if (interrupt_buffer !== null) {
+        interrupt_buffer[0] = 0
+    }
+    try {
+        await load_imports(code)
+    } catch (error) {
+        message_err('' + error)
+        output.flush()
+        return { ok: false, fatal: false }
+    }
+    current_code = code
+    const end = begin_phase('script', { source: 'worker' })
+    try {
+        pyodide.globals.set('code_to_run', code)
+        // run_cells evaluates with eval_code_async, which allows top-level
+        // await, used by arbor_playground.run
+        let run = `run_cells(code_to_run, reset_cells=${reset_cells ? 'True' : 'False'})`
+        const lines = [
+            'from arbor_playground.notebook import run as run_cells',
+            // cells built by an earlier run aren't kept alive, without
+            // importing cell_templates (and numpy) if it wasn't used
+            'import sys',
+            "if 'arbor_playground.cell_templates' in sys.modules:",
+            "    sys.modules['arbor_playground.cell_templates'].clear()",
+        ]
+        if (profile) {
+            lines.push('from arbor_playground.profiling import profiled')
+            run = `profiled(${run})`
+        }
+        // scripts may install the meters themselves, always publish
+        lines.push(
+            'from arbor_playground import meters',
+            meters ? 'meters.install()' : 'pass',
+            'try:',
+            `    await ${run}`,
+            'finally:',
+            '    meters.publish()')
+        await pyodide.runPythonAsync(lines.join('\n'))
+        flush_python_output()
+        result.cells = cell_summary()
+    } catch (error) {
+        let test = '' + error
+        console.log(test)
+        if (test.indexOf('PythonError') === -1) {
+            // probably internal pyodide error or CppError
+            // this means we can't use any of the pyodide functions anymore..
+            message_err(test)
+            result = { ok: false, fatal: true }
+        } else {
+            flush_python_output()
+            message_err(format_python_error(error))
+            result = { ok: false, fatal: false, cells: cell_summary() }
+        }
+    }
+    end()
+    output.flush()
+    try {
+        result.heap_bytes = heap_size()
+    } catch (error) {
+        // gone with the interpreter
+    }
+    return result
+}
+
+/* { count, ran, skipped } cell indices of a run with cells, else null */
+function cell_summary() {
+    return JSON.parse(pyodide.runPython('from arbor_playground import notebook; notebook.summary()'))
+}
+
+/* Compiled module of the catalogue asset from assets.get: compiled while
+ * downloading, or from the copy in the asset store. Modules themselves
+ * can't be kept in IndexedDB, compiling again is left to the browser. */
+async function compiled_module({ path, compiling }) {
+    const module = compiling ? await compiling : null
+    return module || WebAssembly.compile(pyodide.FS.readFile(path))
+}
+
+/* Instantiate a catalogue for the dynamic linker, so dlopen(path) (by
+ * arbor.load_catalogue) finds it loaded instead of compiling it again */
+async function preload_dynlib(path, module) {
+    const Module = pyodide._module
+    const names = dynlib_names(path)
+    // the same entry loadDynamicLibrary makes
+    const dso = { refcount: Infinity, name: names[0], module: 'loading', global: false }
+    names.forEach(name => { Module.LDSO.loadedLibsByName[name] = dso })
+    dso.module = await Module.loadWebAssemblyModule(module, { loadAsync: true, nodelete: true, global: false })
+}
+
+function is_dynlib(path) {
+    return path.endsWith('.so')
+}
+
+// dlopen looks libraries up by normalized path, relative or absolute
+function dynlib_names(path) {
+    const PATH = pyodide._module.PATH
+    return [PATH.normalize(path), PATH.normalize(pyodide.FS.cwd() + '/' + path)]
+}
+
+/* Once loaded, dlopen keeps using a library even if its file is replaced */
+function dynlib_loaded(path) {
+    return dynlib_names(path).some(name => pyodide._module.LDSO.loadedLibsByName[name] !== undefined)
+}
+
+/* Link file into the filesystem from the asset store. Returns false
+ * if it couldn't be downloaded. */
+async function place_file(file) {
+    // stored() needs the index restored from IndexedDB
+    await assets.ready
+    const candidates = []
+    if (file.simd_url !== undefined && use_simd) candidates.push([file.simd_url, ' (simd128)'])
+    if (file.url !== undefined) candidates.push([file.url, ''])
+    for (const [url, variant] of candidates) {
+        if (file.lazy && !assets.stored(url)) {
+            assets.lazy(url, file.path)
+            message_ok('Created file "' + file.path + '"' + variant + ', downloaded on first use')
+            return true
+        }
+        const preload = is_dynlib(file.path) && !dynlib_loaded(file.path)
+        let asset
+        try {
+            asset = await assets.get(url, { compile: preload })
+        } catch (error) {
+            console.warn(error)
+            continue // next variant
+        }
+        assets.link(asset.hash, file.path)
+        if (preload) {
+            await preload_dynlib(file.path, await compiled_module(asset))
+        }
+        message_ok('Created file "' + file.path + '"' + variant)
+        return true
+    }
+    return false
+}
+
+/* Files are { path, url }, optionally with a simd_url of a build using
+ * WebAssembly SIMD, or only a simd_url for a file that is only written
+ * when simd128 is usable. lazy files are only downloaded when the script
+ * reads them. Missing optional files are skipped. All files are fetched
+ * concurrently, see assets.js. */
+async function write_files(files) {
+    pyodide.FS.chdir('/home/pyodide')
+    const placed = await timed_phase('write_files', () => Promise.all(files.map(place_file)),
+        { source: 'worker' })
+    files.forEach((file, i) => {
+        if (placed[i]) {
+            written_files.set(file.path, file)
+        } else if (!file.optional) {
+            message_err('Could not download "' + file.path + '"')
+        }
+    })
+    output.flush()
+}
+
+/* Pool worker i, started and warmed up on first use. A worker that fails
+ * to start is dropped, the next sweep starts a fresh one. */
+function pool_worker(i) {
+    if (pool[i] === undefined) {
+        const w = new PyodideWorker({
+            // only task output, not the boot messages of every worker
+            output: ({stream, text}) => { if (w.busy) output.write(stream, text) },
+            progress: () => {},
+            plot: () => {},
+            extend: () => {},
+            render_html: () => {},
+            phase: () => {},
+        })
+        w.busy = false
+        w.files = new Map() // path -> file it has
+        w.ready = w.request('init', { interrupt_buffer: w.interrupt_buffer, simd: use_simd, pool: true })
+            .then(() => w.request('warmup'))
+            .catch(error => {
+                drop_pool_worker(i, w)
+                throw error
+            })
+        pool[i] = w
+    }
+    return pool[i]
+}
+
+/* Terminate pool worker i if it is still w */
+function drop_pool_worker(i, w) {
+    if (pool[i] === w) {
+        w.terminate()
+        delete pool[i] // a hole, pool.forEach skips it
+    }
+}
+
+/* Run one task per payload on the pool, results in order of the payloads */
+async function sweep(name, payloads, workers) {
+    const size = Math.max(1, Math.min(
+        workers || navigator.hardwareConcurrency || 1, payloads.length))
+    const code = current_code
+    const results = new Array(payloads.length)
+    let next = 0
+    await Promise.all(Array.from({ length: size }, async (_, i) => {
+        const w = pool_worker(i)
+        await w.ready
+        // only the current files, not every version of them
+        const files = [...written_files.values()].filter(file => w.files.get(file.path) !== file)
+        if (files.length > 0) {
+            try {
+                await w.request('write_files', { files })
+            } catch (error) {
+                drop_pool_worker(i, w)
+                throw error
+            }
+            files.forEach(file => w.files.set(file.path, file))
+        }
+        while (next < payloads.length && !abort_requested) {
+            const k = next++
+            w.busy = true
+            try {
+                results[k] = await w.request('sweep_task', { code, name, payload: payloads[k] })
+            } catch (error) {
+                // like in run_code, anything but a Python exception leaves
+                // the interpreter unusable
+                if (('' + error).indexOf('PythonError') === -1) {
+                    drop_pool_worker(i, w)
+                }
+                throw error
+            } finally {
+                w.busy = false
+            }
+        }
+    }))
+    return results
+}
+
+/* In a pool worker: load code as module __sweep__ unless it already is,
+ * then call name with the pickled payload */
+let sweep_namespace = null
+let sweep_code = null
+async function sweep_task(code, name, payload) {
+    abort_requested = false
+    if (interrupt_buffer !== null) {
+        interrupt_buffer[0] = 0
+    }
+    if (code !== sweep_code) {
+        await load_imports(code)
+        if (sweep_namespace !== null) sweep_namespace.destroy()
+        sweep_code = null
+        sweep_namespace = pyodide.toPy({ __name__: '__sweep__' })
+        await pyodide.runPythonAsync(code, { globals: sweep_namespace })
+        sweep_code = code
+    }
+    const call = pyodide.pyimport('arbor_playground.sweep')._call
+    const reply = await call(sweep_namespace, name, payload)
+    call.destroy()
+    const bytes = reply.toJs()
+    reply.destroy()
+    flush_python_output()
+    output.flush()
+    return bytes
+}
+
+function site_packages() {
+    return pyodide.runPython('import sysconfig; sysconfig.get_paths()["purelib"]')
+}
+
+/* Install packages from snapshot/, made by tools/build-snapshot.js: one
+ * archive of site-packages with everything in BOOT_PACKAGES installed and
+ * byte-compiled. Returns false if there is no (usable) snapshot. */
+async function load_snapshot() {
+    let r = await fetch('snapshot/manifest.json')
+    if (!r.ok) return false
+    const manifest = await r.json()
+    if (manifest.pyodide_version !== pyodide.version) {
+        console.warn('Ignoring snapshot built for pyodide', manifest.pyodide_version)
+        return false
+    }
+    r = await fetch('snapshot/' + manifest.archive)
+    if (!r.ok) return false
+    pyodide.unpackArchive(await r.arrayBuffer(), 'tar', { extractDir: site_packages() })
+    for (const lib of manifest.dynlibs) {
+        await pyodide._api.loadDynlib(lib, false)
+    }
+    for (const name of manifest.packages) {
+        pyodide.loadedPackages[name] = 'snapshot'
+    }
+    pyodide.runPython('import importlib; importlib.invalidate_caches()')
+    return true
+}
+
+async function install_playground_package() {
+    const dir = site_packages() + '/arbor_playground'
+    pyodide.FS.mkdirTree(dir)
+    await Promise.all(PLAYGROUND_FILES.map(async (name) => {
+        let r = await fetch('arbor_playground/' + name)
+        if (!r.ok) {
+            // not an error page saved as python, which fails later on import
+            throw new Error(`arbor_playground/${name}: ${r.status} ${r.statusText}`)
+        }
+        pyodide.FS.writeFile(dir + '/' + name, await r.text())
+    }))
+}
+
+async function init(shared_interrupt_buffer, simd, pool) {
+    message_ok('Loading...')
+    use_simd = SIMD_SUPPORTED && simd !== false
+    pyodide = await timed_phase('loadPyodide', () => loadPyodide({
+        stdout: message_ok,
+        stderr: message_err,
+    }), { source: 'worker' })
+    if (shared_interrupt_buffer) {
+        interrupt_buffer = shared_interrupt_buffer
+        pyodide.setInterruptBuffer(interrupt_buffer)
+    } else {
+        message_err('Page is not cross-origin isolated, Stop only works between simulation slices')
+    }
+    py = pyodide // global export for debugging
+    // restored in the background, write_files waits for it
+    assets = new AssetStore(pyodide.FS, { persist: !pool })
+    assets.mount()
+    let end = begin_phase('loadPackages', { source: 'worker' })
+    if (await load_snapshot()) {
+        message_ok('Restored packages from snapshot')
+    } else {
+        await pyodide.loadPackage(BOOT_PACKAGES)
+    }
+    end()
+
+    end = begin_phase('registerJsModule', { source: 'worker' })
+    pyodide.registerJsModule('arbor_playground_js', plot_module)
+    await install_playground_package()
+    pyodide.runPython([
+        'from arbor_playground import _stdio',
+        'from arbor_playground_js import write, schedule_flush',
+        '_stdio.install(write, schedule=schedule_flush)',
+    ].join('\n'))
+    flush_python_output = pyodide.pyimport('arbor_playground._stdio').flush
+    message_ok('Registered html render module')
+    end()
+    output.flush()
+    return { heap_bytes: heap_size() }
+}
+
+/* Not part of init, the page is usable before this has finished. Any run
+ * queued in the meantime simply waits for it. */
+async function warmup() {
+    await timed_phase('cache_imports', () => run_code('import arbor, numpy'), { source: 'worker' })
+    message_ok('Cached arbor')
+    output.flush()
+}
+
+/* Download and install packages scripts are likely to need, without
+ * importing them. Not queued: runs can go ahead in the meantime, pyodide
+ * serializes package loading, so a run needing one of these just waits. */
+async function prefetch(modules) {
+    const packages = modules.filter(name => EXTRA_PACKAGES[name] === undefined)
+        .concat(extra_packages(modules))
+    await timed_phase('prefetch', () => pyodide.loadPackage(packages, console.log, console.warn),
+        { source: 'worker', run: null }) // not queued, may overlap a run
+}
+
+const HANDLERS = {
+    init: ({interrupt_buffer, simd, pool}) => init(interrupt_buffer, simd, pool),
+    warmup: () => warmup(),
+    run: async ({code, run_id, profile, meters, reset_cells}) => {
+        current_run = run_id === undefined ? null : run_id
+        try {
+            return await run_code(code, { profile, meters, reset_cells })
+        } finally {
+            current_run = null
+        }
+    },
+    write_files: ({files}) => write_files(files),
+    sweep_task: ({code, name, payload}) => sweep_task(code, name, payload),
+}
+
+// Requests are handled strictly one after the other, the interpreter is
+// not reentrant and the main thread may queue a run while files are still
+// being written.
+let queue = Promise.resolve()
+
+self.onmessage = (event) => {
+    const { id, type, ...args } = event.data
+    if (type === 'abort') {
+        abort_requested = true
+        pool.forEach(w => w.abort())
+        return
+    }
+    if (type === 'prefetch') {
+        prefetch(args.modules).then(
+            result => post('result', { id, result }),
+            error => post('result', { id, error: '' + error }))
+        return
+    }
+    queue = queue.then(async () => {
+        try {
+            const result = await HANDLERS[type](args)
+            post('result', { id, result })
+        } catch (error) {
+            console.error(error)
+            post('result', { id, error: '' + error })
+        }
+    })
+}